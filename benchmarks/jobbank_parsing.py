@@ -0,0 +1,265 @@
+"""
+Micro-benchmark of jobbank page parsing.
+
+Compares the previous parsing (BeautifulSoup with html.parser over full documents) with the current one
+(lxml elements) and checks that both produce identical jobs.
+Pages saved by the scrapers HTTP cache are used as samples, if no cache is provided
+the pages are generated with the jobbank markup, French text and with or without charset declarations.
+
+Run from the project root:
+    python -m benchmarks.jobbank_parsing [--cache logs/http_cache.db] [--number 20]
+"""
+import argparse
+import json
+import re
+import sqlite3
+import timeit
+import urllib.parse
+from datetime import datetime
+from typing import List, Optional, Tuple, Dict, Any
+
+import requests
+from bs4 import BeautifulSoup, Tag
+
+from job_applier.models.job import Job, SalaryType, Workspace
+from job_applier.scrapers import jobbank
+from job_applier.scrapers.cache import CachedResponse
+
+JOB_FIELDS = [
+    "link", "source_id", "source", "posted_on_jb", "title", "date", "business", "location",
+    "salary", "salary_type", "workspace", "description", "email"
+]
+
+
+def reference_parse_job(job_element: Tag) -> Job:
+    job = Job()
+
+    link_element = job_element.find("a", class_="resultJobItem")
+    if link_element:
+        href = link_element.get("href")
+        url_parts = urllib.parse.urlparse(href)
+        job.link = urllib.parse.urljoin(jobbank.API_PATHS.DOMAIN, url_parts.path)
+
+    job.source_id = job_element.get("id").replace("article-", "")
+    job.source = "jobbank"
+
+    job.posted_on_jb = job_element.find("span", class_="postedonJB") is not None
+
+    title_element = job_element.find("span", class_="noctitle")
+    if title_element:
+        job.title = str(title_element.get_text(strip=True)).capitalize()
+
+    date_element = job_element.find("li", class_="date")
+    if date_element:
+        date_text = date_element.get_text(strip=True)
+        try:
+            job.date = datetime.strptime(date_text, "%B %d, %Y")
+        except ValueError:
+            pass
+
+    business_element = job_element.find("li", class_="business")
+    if business_element:
+        job.business = business_element.get_text(strip=True)
+
+    location_element = job_element.find("li", class_="location")
+    if location_element:
+        for child in location_element.find_all("span"):
+            child.extract()
+        job.location = location_element.get_text(strip=True)
+
+    salary_element = job_element.find("li", class_="salary")
+    if salary_element:
+        for child in salary_element.find_all("span"):
+            child.extract()
+        salary_text = salary_element.get_text(strip=True).lower()
+        if "hourly" in salary_text:
+            job.salary_type = SalaryType.HOURLY
+        elif "annually" in salary_text:
+            job.salary_type = SalaryType.ANNUALLY
+        match = re.search(r"\d+\.\d+", salary_text)
+        if match:
+            job.salary = float(match.group())
+
+    workspace_element = job_element.find("span", class_="telework")
+    if workspace_element:
+        workspace_text = workspace_element.get_text(strip=True)
+        if "on site" in workspace_text:
+            job.workspace = Workspace.ONSITE
+        elif "hybrid" in workspace_text:
+            job.workspace = Workspace.HYBRID
+
+    return job
+
+
+def reference_parse_jobs(content: bytes) -> Optional[List[Job]]:
+    soup = BeautifulSoup(content, "html.parser")
+    result_element = soup.find(id=jobbank.RESULT_BLOCK_ID)
+    if not result_element:
+        return None
+    return [reference_parse_job(job_element) for job_element in result_element.find_all("article")]
+
+
+def reference_parse_job_description(content: bytes) -> Optional[str]:
+    soup = BeautifulSoup(content, "html.parser")
+    job_posting_element = soup.find("div", attrs={"typeof": "JobPosting"})
+    if not job_posting_element:
+        return None
+    job_description_element = job_posting_element.find("span", class_="hidden", attrs={"property": "description"})
+    if not job_description_element:
+        return None
+    job_description = job_description_element.get_text(strip=True)
+    job_description = job_description.replace("\t", "")
+    job_description = job_description.replace("\n", "")
+    return re.sub(r"\s{2,}", " ", job_description)
+
+
+def reference_parse_job_email(content: bytes) -> Optional[str]:
+    soup = BeautifulSoup(content, "xml")
+    cdata_element = soup.find("update", id="applynow")
+    if not cdata_element:
+        return None
+    soup = BeautifulSoup(cdata_element.get_text(), "html.parser")
+    email_element = soup.find("a", href=re.compile(r"mailto:"))
+    if not email_element:
+        return None
+    return email_element.text
+
+
+def generate_search_page(page: int, size: int = 25) -> bytes:
+    # Every other page has no meta charset, so its encoding is known only from headers or the content
+    meta = '<meta charset="utf-8">' if page % 2 else ""
+    articles = "".join(f"""
+    <article id="article-{page * size + i}" class="action-buttons">
+      <a href="/jobsearch/jobposting/{page * size + i};jsessionid=0A1B2C?source=searchresults" class="resultJobItem">
+        <h3 class="title">
+          <span class="flag"><span class="postedonJB">Posted on Job Bank</span></span>
+          <span class="noctitle"> {"COMMIS À LA COMPTABILITÉ" if i % 3 else "BOOKKEEPER &amp; OFFICE ADMINISTRATOR"} {i} </span>
+        </h3>
+        <ul class="list-unstyled">
+          <li class="date">March {i % 28 + 1}, 2025</li>
+          <li class="business">{"Café Québec Comptabilité" if i % 3 else "Maple &amp; Sons Accounting"} {i} Inc.</li>
+          <li class="location"><span class="fa fa-map-marker" aria-hidden="true"></span>
+            <span class="wb-inv">Location</span> {"Montréal (QC)" if i % 3 else "Toronto (ON)"}</li>
+          <li class="salary"><span class="fa fa-dollar" aria-hidden="true"></span>
+            <span class="wb-inv">Salary:</span> ${20 + i}.50 hourly</li>
+        </ul>
+        <span class="telework">{"Work on site" if i % 2 else "Hybrid work"}</span>
+      </a>
+    </article>""" for i in range(size))
+    navigation = "".join(f'<li><a href="/section/{i}">Navigation link {i}</a></li>' for i in range(300))
+    scripts = "".join(f"<script>var config{i} = {{'key': 'value {i}'}};</script>" for i in range(50))
+    return f"""<!DOCTYPE html><html lang="en"><head>{meta}<title>Job search</title>{scripts}</head>
+    <body><header><nav><ul>{navigation}</ul></nav></header>
+    <main><form id="ajaxupdateform"><div id="ajaxupdateform:result_block">{articles}</div></form></main>
+    <footer><ul>{navigation}</ul></footer></body></html>""".encode()
+
+
+def generate_posting_page(number: int) -> bytes:
+    meta = '<meta charset="utf-8">' if number % 2 else ""
+    details = "".join(f"<p>Exigence {i} de l'offre {number}:\t tenue   des livres\n à jour, précision.</p>" for i in range(40))
+    navigation = "".join(f'<li><a href="/section/{i}">Navigation link {i}</a></li>' for i in range(300))
+    return f"""<!DOCTYPE html><html lang="fr"><head>{meta}<title>Offre d'emploi</title></head>
+    <body><header><nav><ul>{navigation}</ul></nav></header>
+    <main><div typeof="JobPosting"><h1 property="title">Bookkeeper</h1>
+    <span class="hidden" property="description">{details}</span>
+    <div class="job-posting-details">{details}</div></div></main>
+    <footer><ul>{navigation}</ul></footer></body></html>""".encode()
+
+
+def generate_apply_now(number: int) -> bytes:
+    return f"""<?xml version="1.0" encoding="UTF-8"?><partial-response id="j_id1"><changes>
+    <update id="applynow"><![CDATA[<div id="applynow"><h4>By email</h4><p>
+    <a href="mailto:hr{number}@maple-accounting.ca">hr{number}@maple-accounting.ca</a></p></div>]]></update>
+    <update id="markappliedgroup"><![CDATA[<div></div>]]></update>
+    </changes></partial-response>""".encode()
+
+
+def create_response(content: bytes, content_type: str) -> requests.Response:
+    return CachedResponse(url="", status_code=200, headers={"Content-Type": content_type},
+                          content=content, stored_at=0).to_response()
+
+
+def generate_samples(pages: int = 4, postings: int = 25) -> Dict[str, List[requests.Response]]:
+    # Every third page is sent without a charset in the headers
+    content_types = ["text/html", "text/html;charset=UTF-8", "text/html; charset=utf-8"]
+    return {
+        "search": [create_response(generate_search_page(page), content_types[page % 3]) for page in range(pages)],
+        "posting": [create_response(generate_posting_page(number), content_types[number % 3])
+                    for number in range(postings)],
+        "apply_now": [create_response(generate_apply_now(number), "text/xml;charset=UTF-8")
+                      for number in range(postings)],
+    }
+
+
+def load_samples(cache_file: str) -> Dict[str, List[requests.Response]]:
+    samples = {"search": [], "posting": [], "apply_now": []}
+    with sqlite3.connect(cache_file) as connection:
+        for url, headers, content in connection.execute(
+                "SELECT url, headers, content FROM responses WHERE status_code = 200"):
+            response = CachedResponse(url=url, status_code=200, headers=json.loads(headers),
+                                      content=content, stored_at=0).to_response()
+            if b"partial-response" in content:
+                samples["apply_now"].append(response)
+            elif b"ajaxupdateform:result_block" in content:
+                samples["search"].append(response)
+            elif b"JobPosting" in content:
+                samples["posting"].append(response)
+    return samples
+
+
+def job_fields(job: Job) -> Dict[str, Any]:
+    return {field: getattr(job, field, None) for field in JOB_FIELDS}
+
+
+def parse_jobs(response: requests.Response) -> Optional[List[Job]]:
+    return jobbank.parse_jobs(response.content, jobbank.RESULT_BLOCK_ID, jobbank.get_encoding(response))
+
+
+def parse_job_description(response: requests.Response) -> Optional[str]:
+    return jobbank.parse_job_description(response.content, jobbank.get_encoding(response))
+
+
+def check_identical(samples: Dict[str, List[requests.Response]]) -> None:
+    for response in samples["search"]:
+        expected = [job_fields(job) for job in reference_parse_jobs(response.content) or []]
+        actual = [job_fields(job) for job in parse_jobs(response) or []]
+        assert expected == actual, "Jobs parsed from the search page differ"
+    for response in samples["posting"]:
+        assert reference_parse_job_description(response.content) == parse_job_description(response), \
+            "Job descriptions differ"
+    for response in samples["apply_now"]:
+        assert reference_parse_job_email(response.content) == jobbank.parse_job_email(response.content), \
+            "Job emails differ"
+
+
+def measure(samples: List[requests.Response], reference, current, number: int) -> Tuple[float, float]:
+    reference_time = timeit.timeit(lambda: [reference(response.content) for response in samples], number=number)
+    current_time = timeit.timeit(lambda: [current(response) for response in samples], number=number)
+    return reference_time, current_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cache", help="SQLite file of the scrapers HTTP cache with saved pages")
+    parser.add_argument("--number", type=int, default=20, help="Number of repetitions")
+    args = parser.parse_args()
+
+    samples = load_samples(args.cache) if args.cache else generate_samples()
+    check_identical(samples)
+
+    cases = [
+        ("search", reference_parse_jobs, parse_jobs),
+        ("posting", reference_parse_job_description, parse_job_description),
+        ("apply_now", reference_parse_job_email, lambda response: jobbank.parse_job_email(response.content)),
+    ]
+    print(f"{'pages':<10}{'count':>6}{'html.parser, s':>16}{'lxml, s':>18}{'speedup':>9}")
+    for name, reference, current in cases:
+        if not samples[name]:
+            continue
+        reference_time, current_time = measure(samples[name], reference, current, args.number)
+        print(f"{name:<10}{len(samples[name]):>6}{reference_time:>16.3f}{current_time:>18.3f}"
+              f"{reference_time / current_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
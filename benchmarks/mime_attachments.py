@@ -0,0 +1,62 @@
+"""
+Benchmark of composing messages with attachments.
+
+Composes messages with the same static attachments, like the applicant resume and cover letter files,
+encoding attachments for every message and reusing them from the attachment cache.
+CPU time and bytes of attachments encoded to base64 are reported.
+
+Run from the project root:
+    python -m benchmarks.mime_attachments [--messages 500] [--size 200] [--attachments 2]
+"""
+import argparse
+import os
+import tempfile
+import time
+from typing import List, Optional
+
+from job_applier.utils.mime import AttachmentCache, create_message
+
+
+def create_files(directory: str, count: int, size: int) -> List[str]:
+    file_paths = []
+    for index in range(count):
+        file_paths.append(os.path.join(directory, f"Ivan_Ivanov_Document_{index}.pdf"))
+        with open(file_paths[-1], "wb") as file:
+            file.write(os.urandom(size * 1024))
+    return file_paths
+
+
+def compose(messages: int, attachments: List[str], cache: Optional[AttachmentCache]) -> float:
+    started_at = time.process_time()
+    for index in range(messages):
+        create_message("i.ivanov@example.com", f"hr{index}@example.com", "Application for Bookkeeper position",
+                       "Dear Hiring Manager, ...", attachments, cache)
+    return time.process_time() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500, help="Number of messages")
+    parser.add_argument("--size", type=int, default=200, help="Size of an attachment in KB")
+    parser.add_argument("--attachments", type=int, default=2, help="Number of attachments of a message")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        attachments = create_files(directory, args.attachments, args.size)
+
+        uncached = AttachmentCache(max_entries=0)
+        uncached_time = compose(args.messages, attachments, uncached)
+        cached = AttachmentCache(max_entries=32)
+        cached_time = compose(args.messages, attachments, cached)
+
+    encoded_mb = uncached.stats["encoded_bytes"] / 1024 / 1024
+    cached_mb = cached.stats["encoded_bytes"] / 1024 / 1024
+    print(f"{'':>10}{'CPU, s':>10}{'encoded, MB':>14}")
+    print(f"{'uncached':>10}{uncached_time:>10.2f}{encoded_mb:>14.1f}")
+    print(f"{'cached':>10}{cached_time:>10.2f}{cached_mb:>14.1f}")
+    print(f"Saved {uncached_time - cached_time:.2f}s of CPU ({1 - cached_time / uncached_time:.0%}) "
+          f"and {encoded_mb - cached_mb:.1f} MB of encoding on {args.messages} messages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark of converting documents to PDF.
+
+Renders the cover letter template from settings into a number of documents and converts them
+one by one through the pool of LibreOffice workers and in batches with few soffice runs.
+
+Run from the project root:
+    python -m benchmarks.pdf_conversion [--documents 100] [--workers 2] [--shards 4] [--soffice PATH]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import List
+
+from docxtpl import DocxTemplate
+
+from job_applier.settings import SETTINGS
+from job_applier.utils.concurrency import map_concurrently
+from job_applier.utils.convert_docx_to_pdf import find_libreoffice
+from job_applier.utils.libreoffice_pool import LibreOfficePool
+from job_applier.utils.pdf_batch import PdfBatchConverter
+
+
+def create_documents(directory: str, count: int) -> List[str]:
+    template = DocxTemplate(SETTINGS['cover_letter']['template']['file'])
+    template.render({
+        'text': "I am writing to apply for the position. " * 20,
+        'job': SimpleNamespace(title="Bookkeeper", business="Company", source_id="0"),
+        'applicant': SimpleNamespace(first_name="Ivan", last_name="Ivanov", email="ivan@example.com"),
+    })
+    first_document = os.path.join(directory, "document_0.docx")
+    template.save(first_document)
+
+    documents = [first_document]
+    for index in range(1, count):
+        documents.append(os.path.join(directory, f"document_{index}.docx"))
+        shutil.copyfile(first_document, documents[-1])
+    return documents
+
+
+def convert_per_file(soffice_path: str, documents: List[str], workers: int, profiles_dir: str) -> float:
+    pool = LibreOfficePool(soffice_path, workers, profiles_dir)
+    started_at = time.perf_counter()
+    try:
+        list(map_concurrently(
+            lambda document: pool.convert(document, os.path.join(os.path.dirname(document), "per_file",
+                                                                 os.path.basename(document)[:-5] + ".pdf")),
+            documents, workers
+        ))
+    finally:
+        pool.close()
+    return time.perf_counter() - started_at
+
+
+def convert_batched(soffice_path: str, documents: List[str], shards: int, profiles_dir: str) -> float:
+    converter = PdfBatchConverter(soffice_path, shards, profiles_dir)
+    for document in documents:
+        converter.enqueue(document, os.path.join(os.path.dirname(document), "batched",
+                                                 os.path.basename(document)[:-5] + ".pdf"))
+    started_at = time.perf_counter()
+    failed = converter.flush()
+    assert not failed, f"{len(failed)} documents are not converted"
+    return time.perf_counter() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100, help="Number of documents")
+    parser.add_argument("--workers", type=int, default=SETTINGS['libreoffice']['workers'],
+                        help="Number of workers of per-file conversion")
+    parser.add_argument("--shards", type=int, default=os.cpu_count() or 1,
+                        help="Number of soffice runs of batched conversion")
+    parser.add_argument("--soffice", help="Path to soffice, it is searched like in the application by default")
+    args = parser.parse_args()
+
+    soffice_path = args.soffice or find_libreoffice()
+    if not soffice_path:
+        print("LibreOffice was not found, pass the path to soffice with --soffice.")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        documents = create_documents(directory, args.documents)
+        os.makedirs(os.path.join(directory, "per_file"))
+        os.makedirs(os.path.join(directory, "batched"))
+        profiles_dir = os.path.join(directory, "profiles")
+
+        per_file_time = convert_per_file(soffice_path, documents, args.workers, profiles_dir)
+        batched_time = convert_batched(soffice_path, documents, args.shards, profiles_dir)
+
+    print(f"{'documents':>10}{'per file, s':>13}{'batched, s':>12}{'speedup':>9}")
+    print(f"{args.documents:>10}{per_file_time:>13.2f}{batched_time:>12.2f}{per_file_time / batched_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
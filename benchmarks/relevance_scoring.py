@@ -0,0 +1,101 @@
+"""
+Benchmark of job relevance scoring.
+
+Scores generated job descriptions against the applicant from settings with the vectorized TF-IDF scorer
+and compares it with a plain Python implementation of the same formula.
+Half of the descriptions are bookkeeping postings and half are postings of unrelated occupations,
+the share of bookkeeping postings among jobs above the threshold is reported.
+
+Run from the project root:
+    python -m benchmarks.relevance_scoring [--jobs 1000 5000 10000] [--number 5]
+"""
+import argparse
+import math
+import random
+import timeit
+from collections import Counter
+from typing import List, Tuple
+
+import numpy as np
+
+from job_applier.relevance import create_relevance_query
+from job_applier.settings import SETTINGS
+from job_applier.utils.tfidf import TfidfScorer, tokenize
+
+RELEVANT_PHRASES = [
+    "full cycle bookkeeping", "accounts payable and accounts receivable", "bank reconciliations",
+    "month end closing", "payroll processing", "GST/HST remittances", "QuickBooks Online", "Sage 50",
+    "prepare financial statements", "general ledger entries", "Excel pivot tables", "invoices and expense reports",
+]
+IRRELEVANT_PHRASES = [
+    "operate forklift", "load and unload trucks", "prepare menu items", "clean kitchen equipment",
+    "drive delivery routes", "install drywall", "serve customers at the counter", "stock shelves",
+    "repair plumbing fixtures", "perform routine maintenance", "follow safety procedures", "lift up to 50 lbs",
+]
+COMMON_PHRASES = [
+    "work in a fast paced environment", "strong communication skills", "attention to detail", "team player",
+    "full time permanent position", "on site work", "benefits and paid vacation", "English language",
+]
+
+
+def generate_description(rng: random.Random, relevant: bool) -> str:
+    phrases = RELEVANT_PHRASES if relevant else IRRELEVANT_PHRASES
+    sentences = [f"Duties: {rng.choice(phrases)}, {rng.choice(phrases)} and {rng.choice(COMMON_PHRASES)}."
+                 for _ in range(rng.randint(10, 30))]
+    return " ".join(sentences)
+
+
+def generate_samples(count: int, seed: int = 0) -> Tuple[List[str], List[bool]]:
+    rng = random.Random(seed)
+    labels = [index % 2 == 0 for index in range(count)]
+    return [generate_description(rng, label) for label in labels], labels
+
+
+def reference_score(query: str, documents: List[str]) -> List[float]:
+    tokenized = [Counter(tokenize(document)) for document in documents]
+    document_frequency = Counter(term for counts in tokenized for term in counts)
+    query_counts = Counter(tokenize(query))
+
+    def idf(term: str) -> float:
+        return math.log((1 + len(documents)) / (1 + document_frequency[term])) + 1
+
+    query_vector = {term: (1 + math.log(count)) * idf(term) for term, count in query_counts.items()}
+    query_norm = math.sqrt(sum(weight ** 2 for weight in query_vector.values()))
+
+    scores = []
+    for counts in tokenized:
+        vector = {term: (1 + math.log(count)) * idf(term) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight ** 2 for weight in vector.values()))
+        dot = sum(weight * query_vector.get(term, 0) for term, weight in vector.items())
+        scores.append(dot / (norm * query_norm) if norm and query_norm else 0.0)
+    return scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1000, 5000, 10000], help="Numbers of descriptions")
+    parser.add_argument("--number", type=int, default=5, help="Number of repetitions")
+    args = parser.parse_args()
+
+    query = create_relevance_query()
+    scorer = TfidfScorer(query)
+    threshold = SETTINGS['job']['relevance']['threshold']
+
+    print(f"{'jobs':>6}{'python, s':>12}{'numpy, s':>12}{'speedup':>9}{'above threshold':>17}{'relevant':>10}")
+    for count in args.jobs:
+        documents, labels = generate_samples(count)
+
+        scores = scorer.score(documents)
+        assert np.allclose(scores, reference_score(query, documents)), "Scores differ"
+
+        reference_time = timeit.timeit(lambda: reference_score(query, documents), number=args.number) / args.number
+        current_time = timeit.timeit(lambda: scorer.score(documents), number=args.number) / args.number
+
+        selected = [label for label, score in zip(labels, scores) if score >= threshold]
+        precision = sum(selected) / len(selected) if selected else 0
+        print(f"{count:>6}{reference_time:>12.3f}{current_time:>12.3f}{reference_time / current_time:>8.1f}x"
+              f"{len(selected):>17}{precision:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
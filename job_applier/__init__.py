@@ -1,22 +1,30 @@
 import logging
 import os
-from typing import List
+from typing import Iterator, Iterable, List
 
 import openai
 from dotenv import load_dotenv
 
-from job_applier import databese, log, scrapers
+from job_applier import databese, log, scrapers, llm, prompts, artifacts, outbox
+from job_applier.batch import create_batch_applications
+from job_applier.duplicates import link_near_duplicate, is_original
+from job_applier.outbox import OutboxSender, get_outbox_sender
+from job_applier.relevance import rank_jobs, is_relevant
 from job_applier.databese import DATABASE_USE
 from job_applier.log import logger
 from job_applier.models.applicant import Applicant, save_applicant, log_applicant
-from job_applier.models.application import Application, log_application, save_application, check_application, \
-    save_applications, log_applications
+from job_applier.models.application import Application, log_application, save_application, \
+    save_applications, log_applications, check_eligibility, APPLICATION_FILTERS
 from job_applier.models.cover_letter import CoverLetterModel, log_cover_letter
+from job_applier.models import email_template
 from job_applier.models.email import EmailModel
-from job_applier.models.job import find_jobs, log_jobs, save_jobs, Job, JOB_FINDERS
+from job_applier.models.job import find_jobs, log_jobs, save_jobs, Job, JOB_FINDERS, log_job
 from job_applier.models.resume import log_resume, ResumeModel
-from job_applier.scrapers import jobbank
+from job_applier.scrapers import jobbank, cache as scrapers_cache
 from job_applier.settings import SETTINGS
+from job_applier.utils import libreoffice_pool, smtp_pool, mime
+from job_applier.utils.concurrency import map_concurrently
+from job_applier.utils.convert_docx_to_pdf import convert_pending_to_pdf
 
 
 def init() -> None:
@@ -52,16 +60,37 @@ def init_db() -> None:
 def start() -> None:
     logging.info("App started...")
     start_job_founding()
+    scrapers_cache.log_stats()
+    llm.log_stats()
+    prompts.log_stats()
+    libreoffice_pool.log_stats()
+    email_template.log_stats()
+    artifacts.log_stats()
+    smtp_pool.log_stats()
+    outbox.log_stats()
+    mime.log_stats()
 
 
 def start_job_founding() -> None:
     applicant = create_applicant()
-    jobs = find_and_save_jobs()
 
-    if jobs:
-        applications = create_applications(applicant=applicant, jobs=jobs)
-        if applications and SETTINGS["job"]["applying"]:
-            process_applications(applications)
+    # Jobs and applications are streamed through the stages one by one
+    jobs = find_and_save_jobs()
+    if SETTINGS['job']['near_duplicates']['enabled']:
+        APPLICATION_FILTERS.append(is_original)
+    if SETTINGS['job']['relevance']['enabled']:
+        # Jobs are ranked after all of them are found, less relevant jobs are filtered before applying
+        jobs = rank_jobs(jobs)
+        APPLICATION_FILTERS.append(is_relevant)
+    applications = create_applications(applicant=applicant, jobs=jobs)
+    if SETTINGS['libreoffice']['batch']['enabled']:
+        applications = convert_documents(applications)
+
+    if SETTINGS["job"]["applying"]:
+        process_applications(applications)
+    else:
+        for _ in applications:
+            pass
 
 
 def create_applicant() -> Applicant:
@@ -82,78 +111,163 @@ def create_applicant() -> Applicant:
     return applicant
 
 
-def find_and_save_jobs() -> List[Job]:
+def find_and_save_jobs() -> Iterator[Job]:
     logger.info(f"Start finding jobs, title: {SETTINGS['job']['title']}, location: {SETTINGS['job']['location']}")
 
     JOB_FINDERS.append(jobbank.find_jobs)
 
     # Find jobs
-    jobs = find_jobs()
-    logger.info(f"Jobs found: {len(jobs)}")
+    jobs_count = 0
+    for job in save_found_jobs(find_jobs()):
+        jobs_count += 1
+        yield job
 
-    if jobs:
+    logger.info(f"Jobs found: {jobs_count}")
 
-        # Log jobs
-        log_file = SETTINGS['log']['jobs']['file']
-        if log_file:
-            log_jobs(jobs)
-            logger.info(f"Jobs are logged in the file: {log_file}")
+    log_file = SETTINGS['log']['jobs']['file']
+    if jobs_count and log_file:
+        logger.info(f"Jobs are logged in the file: {log_file}")
 
-        # Save/update jobs
-        if DATABASE_USE:
-            save_jobs(jobs)
-            logger.info("Jobs are saved in the database.")
+    if jobs_count and DATABASE_USE:
+        logger.info("Jobs are saved in the database.")
 
-    return jobs
 
+def select_eligible_jobs(applicant: Applicant, jobs: Iterable[Job]) -> Iterator[Job]:
+    skipped_count = 0
+    for job in jobs:
+        reason = check_eligibility(job=job, applicant=applicant)
+        if reason:
+            skipped_count += 1
+            logger.info(f"Application for job({job.title}, {job.source_id}) is not created: {reason}")
+            continue
+        yield job
 
-def create_applications(applicant: Applicant, jobs: List[Job]) -> List[Application]:
-    logger.info("Start creation cover letters for jobs...")
+    logger.info(f"Jobs skipped before creating applications: {skipped_count}")
 
-    # Create applications
-    cover_letters: List[CoverLetterModel] = []
-    resumes: List[ResumeModel] = []
-    applications: List[Application] = []
-    for current_job in jobs:
 
-        existing_application = check_application(job=current_job, applicant=applicant)
-        if existing_application:
-            logger.info(
-                f"Applicant {applicant} already applied to job {current_job} at {existing_application.applied_at}")
-            continue
+def create_applications(applicant: Applicant, jobs: Iterable[Job]) -> Iterator[Application]:
+    logger.info("Start creation cover letters for jobs...")
 
-        current_application = Application(
+    def create_application(current_job: Job) -> Application:
+        return Application(
             applicant=applicant,
             job=current_job
         )
-        applications.append(current_application)
-        cover_letters.append(current_application.cover_letter)
-        resumes.append(current_application.resume)
 
-    # Log applications(cover letters)
-    log_file = SETTINGS['log']['cover_letters']['file']
-    if cover_letters and log_file:
-        for cover_letter in cover_letters:
-            log_cover_letter(cover_letter=cover_letter)
-        logger.info(f"Cover letters are logged in the file: {log_file}")
+    # Texts and files are generated only for jobs which can be applied
+    jobs = select_eligible_jobs(applicant=applicant, jobs=jobs)
 
-    # Log applications(resumes)
-    log_file = SETTINGS['log']['resumes']['file']
-    if resumes and log_file:
-        for resume in resumes:
-            log_resume(resume=resume)
-        logger.info(f"Resumes are logged in the file: {log_file}")
+    # Create applications, texts of several applications are generated in parallel
+    # or by one batch of all applications of the run
+    if SETTINGS['openai']['batch']['enabled']:
+        applications = create_batch_applications(applicant=applicant, jobs=jobs)
+    else:
+        applications = map_concurrently(create_application, jobs, SETTINGS['openai']['concurrency'])
 
-    return applications
+    for current_application in applications:
 
+        # Log applications(cover letters)
+        if SETTINGS['log']['cover_letters']['file']:
+            log_cover_letter(cover_letter=current_application.cover_letter)
+
+        # Log applications(resumes)
+        if SETTINGS['log']['resumes']['file']:
+            log_resume(resume=current_application.resume)
+
+        yield current_application
+
+
+def save_found_jobs(jobs: Iterable[Job]) -> Iterator[Job]:
+    # Found jobs are saved together by one transaction per batch
+    batch_size = SETTINGS['database']['batch_size']
+    pending_jobs = []
+    for job in jobs:
+        # Log job
+        if SETTINGS['log']['jobs']['file']:
+            log_job(job)
+
+        pending_jobs.append(job)
+        if len(pending_jobs) >= batch_size:
+            yield from save_pending_jobs(pending_jobs)
+            pending_jobs = []
+
+    yield from save_pending_jobs(pending_jobs)
 
-def process_applications(applications: List[Application]) -> None:
-    logger.info("Start applying for jobs...")
 
-    # Apply for jobs
+def save_pending_jobs(jobs: List[Job]) -> List[Job]:
+    # Save/update jobs
+    if DATABASE_USE and jobs:
+        save_jobs(jobs)
+
+        # Link reposts to jobs found before
+        if SETTINGS['job']['near_duplicates']['enabled']:
+            for job in jobs:
+                link_near_duplicate(job)
+
+    return jobs
+
+
+def convert_documents(applications: Iterable[Application]) -> Iterator[Application]:
+    # Documents of several applications are converted to PDF together before applications are sent
+    batch_size = SETTINGS['libreoffice']['batch']['size']
+    pending_applications = []
     for application in applications:
-        if not application.email or not application.email.to:
-            continue
+        pending_applications.append(application)
+        if len(pending_applications) >= batch_size:
+            convert_pending_to_pdf()
+            yield from pending_applications
+            pending_applications = []
+
+    convert_pending_to_pdf()
+    yield from pending_applications
+
+
+def process_applications(applications: Iterable[Application]) -> None:
+    logger.info("Start applying for jobs...")
+
+    sender = get_outbox_sender() if DATABASE_USE else None
+    if sender:
+        send_applications(sender, applications)
+        return
+
+    # Apply for jobs, emails are sent in parallel over open SMTP connections
+    for application in map_concurrently(apply_application, applications, SETTINGS['email']['connections']):
+        if SETTINGS['log']['applications']['file']:
+            log_application(application)
+
+        if DATABASE_USE:
+            save_application(application)
+
+
+def send_applications(sender: OutboxSender, applications: Iterable[Application]) -> None:
+    # Emails are put to the outbox and sent in the background, so generation of next applications is not blocked
+    sender.start()
+    try:
+        for application in applications:
+            job, applicant = application.job, application.applicant
+            save_application(application)
+
+            # The saved application is detached, the sender logs it with its job and applicant when it is sent
+            application.job, application.applicant = job, applicant
+
+            enqueued = False
+            if application.id and application.email and application.email.to and not application.applied:
+                try:
+                    enqueued = sender.enqueue(application)
+                    if enqueued:
+                        logger.info(f"Application for job({job.title}, {job.source_id}) is put to the outbox.")
+                except Exception as e:
+                    logger.error(f"Error while putting application for job {job.source_id} to the outbox: {e}")
+
+            # Applications which are not sent are logged right away
+            if not enqueued:
+                sender.log_application(application)
+    finally:
+        sender.stop()
+
+
+def apply_application(application: Application) -> Application:
+    if application.email and application.email.to:
         try:
             application.apply()
             logger.info(
@@ -162,12 +276,4 @@ def process_applications(applications: List[Application]) -> None:
             logger.info(
                 f"An error occurred during the application process for job({application.job.title}, {application.job.source_id}, {application.job.email})")
             logger.error(f"Error during : {e}")
-
-    log_file = SETTINGS['log']['applications']['file']
-    if log_file:
-        log_applications(applications)
-        logger.info(f"Applications are logged in the file: {log_file}")
-
-    if DATABASE_USE:
-        save_applications(applications)
-        logger.info("Applications are saved in the database.")
+    return application
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple, TYPE_CHECKING
+
+from job_applier.log import logger
+from job_applier.models.base import Base
+from job_applier.settings import SETTINGS
+from job_applier.utils.convert_docx_to_pdf import libreoffice_available, convert_to_pdf
+from job_applier.utils.docx_render import render_file
+
+if TYPE_CHECKING:
+    from job_applier import Applicant, Job
+
+# Bookkeeping columns of models which are not shown in documents and change between runs
+IGNORED_COLUMNS = {
+    "_sa_instance_state", "id", "created_at", "updated_at", "details_updated_at", "relevance", "minhash",
+    "duplicate_of_id", "condensed_description", "condensed_description_key",
+}
+
+INDEX_FILE_NAME = "index.db"
+
+_STORE: Optional["ArtifactStore"] = None
+_STORE_LOCK = threading.Lock()
+
+
+class ArtifactStore:
+    """
+    Rendered documents addressed by the hash of the template bytes and the render context.
+    A document is rendered and converted once, applications with the same content reuse the stored files.
+    Every document owner (kind of the document, job and applicant) references its latest artifact,
+    artifacts which are not referenced are removed by the garbage collection.
+    :param directory: Directory of artifacts, every artifact is stored in the subdirectory named by its key
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.stats = {"hits": 0, "misses": 0}
+        self._template_digests: Dict[Tuple[str, float, int], str] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(os.path.join(directory, INDEX_FILE_NAME), check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS artifact_references (owner TEXT PRIMARY KEY, key TEXT, accessed_at REAL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS artifact_references_key ON artifact_references (key)"
+        )
+        self._connection.commit()
+
+    def get_template_digest(self, template_file_path: str) -> str:
+        stat = os.stat(template_file_path)
+        template_id = (os.path.abspath(template_file_path), stat.st_mtime, stat.st_size)
+        with self._lock:
+            digest = self._template_digests.get(template_id)
+        if digest is None:
+            with open(template_file_path, "rb") as template_file:
+                digest = hashlib.sha256(template_file.read()).hexdigest()
+            with self._lock:
+                self._template_digests[template_id] = digest
+        return digest
+
+    def create_key(self, template_file_path: str, context: Dict[str, Any], file_name: str) -> str:
+        data = json.dumps(
+            [self.get_template_digest(template_file_path), file_name, context],
+            sort_keys=True, ensure_ascii=False, default=serialize
+        )
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def create_file(self, template_file_path: str, context: Dict[str, Any], file_name: str, owner: str) -> str:
+        """
+        Returns the document rendered from the template, it is rendered and converted to PDF
+        only if the store has no document with the same template and context.
+        :param template_file_path: Path to the .docx template
+        :param context: Values of the template
+        :param file_name: Name of the document file without the extension
+        :param owner: Identifier of the document owner
+        :return: Path to the PDF file if LibreOffice is available, otherwise to the .docx file
+        """
+
+        key = self.create_key(template_file_path, context, file_name)
+        artifact_dir = os.path.join(self.directory, key)
+        docx_path = os.path.join(artifact_dir, f"{file_name}{os.path.splitext(template_file_path)[1]}")
+        pdf_path = os.path.join(artifact_dir, f"{file_name}.pdf")
+        result_file = pdf_path if libreoffice_available() else docx_path
+
+        if os.path.exists(result_file):
+            self._count("hits")
+        else:
+            self._count("misses")
+            if not os.path.exists(docx_path):
+                # The document is saved under the temporary name first, so an interrupted run leaves no broken file
+                os.makedirs(artifact_dir, exist_ok=True)
+                render_file(template_file_path, context, f"{docx_path}.part")
+                os.replace(f"{docx_path}.part", docx_path)
+            if result_file == pdf_path:
+                convert_to_pdf(docx_path, pdf_path)
+
+        self.reference(owner, key)
+        return result_file
+
+    def reference(self, owner: str, key: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO artifact_references (owner, key, accessed_at) VALUES (?, ?, ?)",
+                (owner, key, time.time())
+            )
+            self._connection.commit()
+
+    def collect_garbage(self, max_age: float = 0) -> Tuple[int, int]:
+        """
+        Removes artifacts which are not referenced by any owner.
+        :param max_age: Seconds after which references which were not used by runs are removed (0 - never)
+        :return: Number of removed artifacts and their size in bytes
+        """
+
+        with self._lock:
+            if max_age:
+                self._connection.execute(
+                    "DELETE FROM artifact_references WHERE accessed_at < ?", (time.time() - max_age,)
+                )
+                self._connection.commit()
+            referenced = {key for (key,) in self._connection.execute("SELECT DISTINCT key FROM artifact_references")}
+
+        removed, removed_size = 0, 0
+        for key in os.listdir(self.directory):
+            artifact_dir = os.path.join(self.directory, key)
+            if key in referenced or not os.path.isdir(artifact_dir):
+                continue
+            for root, _, files in os.walk(artifact_dir):
+                removed_size += sum(os.path.getsize(os.path.join(root, file)) for file in files)
+            shutil.rmtree(artifact_dir, ignore_errors=True)
+            removed += 1
+        return removed, removed_size
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def log_stats(self) -> None:
+        logger.info(f"Artifact store: reused documents {self.stats['hits']}, rendered {self.stats['misses']}")
+
+
+def serialize(value: Any) -> Any:
+    if isinstance(value, Base):
+        return {key: item for key, item in vars(value).items() if key not in IGNORED_COLUMNS}
+    return str(value)
+
+
+def create_owner(kind: str, job: "Job", applicant: "Applicant") -> str:
+    return f"{kind}:{job.source}:{job.source_id}:{applicant.email}"
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    global _STORE
+
+    directory = SETTINGS['artifacts']['directory']
+    if not directory:
+        return None
+
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ArtifactStore(directory)
+        return _STORE
+
+
+def collect_garbage() -> None:
+    store = get_artifact_store()
+    if not store:
+        logger.info("Artifact store is disabled, nothing to collect.")
+        return
+
+    removed, removed_size = store.collect_garbage(SETTINGS['artifacts']['max_age'])
+    logger.info(f"Artifact store: removed {removed} unreferenced documents, {removed_size / 1024 / 1024:.1f} MB")
+
+
+def log_stats() -> None:
+    if _STORE:
+        _STORE.log_stats()
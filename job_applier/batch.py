@@ -0,0 +1,356 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, Iterable, Iterator, Callable
+
+from openai import OpenAI
+
+from job_applier.completion_cache import CompletionCache
+from job_applier.log import logger
+from job_applier.models.applicant import Applicant
+from job_applier.models.application import Application, check_application, check_eligibility
+from job_applier.models.batch import Batch, BatchRequest, BatchRequestStatus, save_batch, save_batch_requests, \
+    get_batches, get_batch_requests
+from job_applier.models.cover_letter import CoverLetterModel, create_cover_letter_request
+from job_applier.models.documents import create_documents_request, parse_documents
+from job_applier.models.email import EmailModel, create_email_request
+from job_applier.models.job import Job, get_jobs
+from job_applier.models.resume import ResumeModel, create_resume_request
+from job_applier.settings import SETTINGS
+
+# Statuses of the Batch API after which the batch is not changed anymore
+FINISHED_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+class BatchClient(ABC):
+    """
+    Client submitting JSONL files of requests and retrieving JSONL files of their results
+    in the format of the Batch API.
+    """
+
+    @abstractmethod
+    def submit(self, file_path: str) -> str:
+        """
+        Submits the file of requests.
+        :param file_path: The JSONL file of requests
+        :return: ID of the batch
+        """
+
+    @abstractmethod
+    def retrieve(self, batch_id: str) -> Tuple[str, Optional[bytes]]:
+        """
+        Checks the batch.
+        :param batch_id: ID of the batch
+        :return: Status of the batch and the JSONL content of results when the batch is finished
+        """
+
+
+class OpenAIBatchClient(BatchClient):
+
+    def __init__(self, client: Optional[OpenAI] = None) -> None:
+        self.client = client or OpenAI()
+
+    def submit(self, file_path: str) -> str:
+        with open(file_path, "rb") as file:
+            input_file = self.client.files.create(file=file, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h"
+        )
+        return batch.id
+
+    def retrieve(self, batch_id: str) -> Tuple[str, Optional[bytes]]:
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status not in FINISHED_STATUSES or not batch.output_file_id:
+            return batch.status, None
+        return batch.status, self.client.files.content(batch.output_file_id).content
+
+
+class LocalBatchClient(BatchClient):
+    """
+    Stand-in of the Batch API working with files of the directory.
+    The input of a batch is copied to <batch_id>_input.jsonl and the batch is completed
+    as soon as <batch_id>_output.jsonl appears.
+    :param directory: The directory of files
+    :param responder: Function returning the content of the response to the request body,
+    if it is set, the output is written right on submit
+    """
+
+    def __init__(self, directory: str, responder: Optional[Callable[[Dict[str, Any]], str]] = None) -> None:
+        self.directory = directory
+        self.responder = responder
+        os.makedirs(directory, exist_ok=True)
+
+    def submit(self, file_path: str) -> str:
+        batch_id = f"local_batch_{uuid.uuid4().hex}"
+        input_file = os.path.join(self.directory, f"{batch_id}_input.jsonl")
+        if os.path.abspath(file_path) != os.path.abspath(input_file):
+            shutil.copyfile(file_path, input_file)
+
+        if self.responder:
+            with open(input_file, encoding="utf-8") as file, \
+                    open(self.get_output_file(batch_id), "w", encoding="utf-8") as output:
+                for line in file:
+                    request = json.loads(line)
+                    output.write(json.dumps(create_result(request["custom_id"], self.responder(request["body"]))))
+                    output.write("\n")
+
+        return batch_id
+
+    def retrieve(self, batch_id: str) -> Tuple[str, Optional[bytes]]:
+        output_file = self.get_output_file(batch_id)
+        if not os.path.exists(output_file):
+            return "in_progress", None
+        with open(output_file, "rb") as file:
+            return "completed", file.read()
+
+    def get_output_file(self, batch_id: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}_output.jsonl")
+
+
+def create_result(custom_id: str, content: str) -> Dict[str, Any]:
+    return {
+        "id": f"batch_req_{uuid.uuid4().hex}",
+        "custom_id": custom_id,
+        "response": {
+            "status_code": 200,
+            "body": {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]},
+        },
+        "error": None,
+    }
+
+
+def get_client(settings: Dict[str, Any]) -> BatchClient:
+    if settings['client'] == "local":
+        return LocalBatchClient(settings['directory'])
+    return OpenAIBatchClient()
+
+
+def create_requests(job: Job, applicant: Applicant) -> Dict[str, Dict[str, Any]]:
+    """
+    Creates requests generating texts of the application, the same ones the models send one by one.
+    :return: Requests by kinds of texts
+    """
+
+    cover_letter = not applicant.cover_letter_file_path
+    resume = not applicant.resume_file_path
+
+    # Emails filled from templates are not requested for every job
+    email = not SETTINGS['openai']['create_applicant_email_template']['enabled']
+
+    if not (email or cover_letter or resume):
+        return {}
+
+    if SETTINGS['openai']['create_applicant_documents']['enabled']:
+        return {"documents": create_documents_request(job, applicant, email=email, cover_letter=cover_letter,
+                                                      resume=resume)}
+
+    requests = {}
+    if email:
+        requests["email"] = create_email_request(job=job, applicant=applicant)
+    if cover_letter:
+        requests["cover_letter"] = create_cover_letter_request(job=job, applicant=applicant)
+    if resume:
+        requests["resume"] = create_resume_request(job=job, applicant=applicant)
+    return requests
+
+
+def create_request_key(model: str, request: Dict[str, Any]) -> str:
+    return CompletionCache.create_key(model, request["messages"], request.get("response_format"))
+
+
+def submit_batch(client: BatchClient, model: str, requests: List[Tuple[Job, str, str, Dict[str, Any]]],
+                 directory: str) -> Tuple[Batch, List[BatchRequest]]:
+    """
+    Writes requests into the JSONL file and submits it.
+    :param client: The batch client
+    :param model: The model of requests
+    :param requests: Jobs, kinds of texts, keys and requests
+    :param directory: The directory of batch files
+    :return: The submitted batch and its requests
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    input_file = os.path.join(directory, f"batch_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.jsonl")
+    with open(input_file, "w", encoding="utf-8") as file:
+        for _, _, key, request in requests:
+            body = {"model": model, "messages": request["messages"]}
+            if request.get("response_format"):
+                body["response_format"] = request["response_format"]
+            file.write(json.dumps({"custom_id": key, "method": "POST", "url": BATCH_ENDPOINT, "body": body}))
+            file.write("\n")
+
+    batch = Batch(id=client.submit(input_file), status="validating", input_file=input_file)
+    batch_requests = [
+        BatchRequest(
+            key=key,
+            batch_id=batch.id,
+            job_source=job.source,
+            job_source_id=job.source_id,
+            kind=kind,
+            status=BatchRequestStatus.PENDING
+        )
+        for job, kind, key, _ in requests
+    ]
+    save_batch(batch, batch_requests)
+    logger.info(f"Batch {batch.id} with {len(batch_requests)} requests is submitted, file: {input_file}")
+    return batch, batch_requests
+
+
+def read_results(output: bytes, requests: Dict[str, BatchRequest]) -> None:
+    for line in output.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        request = requests.get(result.get("custom_id"))
+        if not request:
+            continue
+        response = result.get("response") or {}
+        choices = (response.get("body") or {}).get("choices") or []
+        if response.get("status_code") == 200 and choices:
+            request.content = choices[0].get("message", {}).get("content")
+            request.status = BatchRequestStatus.COMPLETED
+        else:
+            logger.warning(f"Batch request {request.kind} for job {request.job_source_id} failed: "
+                           f"{result.get('error') or response.get('status_code')}")
+
+
+def wait_for_batches(client: BatchClient, batches: List[Batch], requests: Dict[str, BatchRequest],
+                     directory: str, wait: float, poll_interval: float) -> None:
+    """
+    Polls batches until they are finished or the wait time is over and fills requests by results.
+    Requests of finished batches without results are failed.
+    """
+
+    deadline = time.monotonic() + wait
+    pending = [batch for batch in batches if batch.status not in FINISHED_STATUSES]
+    while pending:
+        for batch in list(pending):
+            batch.status, output = client.retrieve(batch.id)
+            if batch.status not in FINISHED_STATUSES:
+                continue
+            pending.remove(batch)
+
+            batch_requests = {key: request for key, request in requests.items() if request.batch_id == batch.id}
+            if output:
+                batch.output_file = os.path.join(directory, f"{batch.id}_output.jsonl")
+                with open(batch.output_file, "wb") as file:
+                    file.write(output)
+                read_results(output, batch_requests)
+            for request in batch_requests.values():
+                if request.status == BatchRequestStatus.PENDING:
+                    request.status = BatchRequestStatus.FAILED
+            save_batch(batch, batch_requests.values())
+            logger.info(f"Batch {batch.id} is {batch.status}.")
+
+        if not pending or time.monotonic() + poll_interval > deadline:
+            break
+        logger.info(f"Waiting for batches: {', '.join(batch.id for batch in pending)}")
+        time.sleep(poll_interval)
+
+    for batch in pending:
+        logger.info(f"Batch {batch.id} is {batch.status}, its results will be used by the next run.")
+
+
+def create_application(job: Job, applicant: Applicant, texts: Dict[str, Optional[str]]) -> Application:
+    """
+    Creates the application from generated texts, missing texts are generated by the models one by one.
+    """
+
+    if texts.get("documents"):
+        documents = parse_documents(texts["documents"])
+        texts = {"email": documents.email, "cover_letter": documents.cover_letter, "resume": documents.resume}
+
+    cover_letter = CoverLetterModel(job=job, applicant=applicant, text=texts.get("cover_letter"))
+    resume = ResumeModel(job=job, applicant=applicant, text=texts.get("resume"))
+    email = EmailModel(job=job, applicant=applicant, text=texts.get("email"),
+                       attachments=[cover_letter.file_path, resume.file_path])
+    return Application(applicant=applicant, job=job, cover_letter=cover_letter, resume=resume, email=email)
+
+
+def create_batch_applications(applicant: Applicant, jobs: Iterable[Job],
+                              client: Optional[BatchClient] = None) -> Iterator[Application]:
+    """
+    Generates texts of all applications of the run by the Batch API and yields applications
+    when results are ready.
+    Batches and their requests are saved in the database, so results of batches which were not finished
+    during the run are used by the next run, requests which were already submitted are not submitted again.
+    :param applicant: The applicant
+    :param jobs: Jobs to apply
+    :param client: The batch client, by default it is created by settings
+    :return: An iterator of applications
+    """
+
+    settings = SETTINGS['openai']['batch']
+    client = client or get_client(settings)
+    model = SETTINGS['openai']['version']
+
+    # Requests of the run by jobs
+    jobs_requests: Dict[Tuple[str, str], Tuple[Job, Dict[str, str]]] = {}
+    run_requests: Dict[str, Tuple[Job, str, Dict[str, Any]]] = {}
+    for job in jobs:
+        existing_application = check_application(job=job, applicant=applicant)
+        if existing_application:
+            logger.info(f"Applicant {applicant} already applied to job {job} at {existing_application.applied_at}")
+            continue
+
+        keys = {}
+        for kind, request in create_requests(job, applicant).items():
+            key = create_request_key(model, request)
+            keys[kind] = key
+            run_requests[key] = (job, kind, request)
+        jobs_requests[(job.source, job.source_id)] = (job, keys)
+
+    # Requests submitted by previous runs are not submitted again
+    requests = get_batch_requests(keys=list(run_requests))
+    unused_requests = get_batch_requests(statuses=[BatchRequestStatus.PENDING, BatchRequestStatus.COMPLETED])
+    requests.update(unused_requests)
+
+    batches = get_batches(list({request.batch_id for request in requests.values()}))
+    new_requests = [(job, kind, key, request) for key, (job, kind, request) in run_requests.items()
+                    if key not in requests]
+    if new_requests:
+        batch, batch_requests = submit_batch(client, model, new_requests, settings['directory'])
+        batches[batch.id] = batch
+        requests.update({request.key: request for request in batch_requests})
+
+    wait_for_batches(client, list(batches.values()), requests, settings['directory'],
+                     settings['wait'], settings['poll_interval'])
+
+    # Results of previous runs for jobs which are not found again
+    for source in {request.job_source for request in unused_requests.values()}:
+        source_ids = [request.job_source_id for request in unused_requests.values()
+                      if request.job_source == source and (source, request.job_source_id) not in jobs_requests]
+        for job in get_jobs(source, source_ids).values():
+            job_requests = [request for request in unused_requests.values()
+                            if (request.job_source, request.job_source_id) == (job.source, job.source_id)]
+
+            # Results of jobs which can not be applied anymore are not used for applications
+            reason = check_eligibility(job=job, applicant=applicant)
+            if reason:
+                logger.info(f"Results of previous runs for job({job.title}, {job.source_id}) are not used: {reason}")
+                for request in job_requests:
+                    request.status = BatchRequestStatus.USED
+                save_batch_requests(job_requests)
+                continue
+
+            jobs_requests[(job.source, job.source_id)] = (job, {request.kind: request.key for request in job_requests})
+
+    for job, keys in jobs_requests.values():
+        job_requests = [requests[key] for key in keys.values() if key in requests]
+        if any(request.status == BatchRequestStatus.PENDING for request in job_requests):
+            continue
+
+        texts = {request.kind: request.content for request in job_requests}
+        yield create_application(job, applicant, texts)
+
+        for request in job_requests:
+            request.status = BatchRequestStatus.USED
+        save_batch_requests(job_requests)
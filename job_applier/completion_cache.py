@@ -0,0 +1,119 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, List, Dict, Any
+
+from job_applier.log import logger
+from job_applier.settings import SETTINGS
+
+_CACHE: Optional["CompletionCache"] = None
+_CACHE_LOCK = threading.Lock()
+
+
+class CompletionCache:
+    """
+    Persistent cache of LLM completions.
+    Completions are addressed by the hash of the model, the fully rendered messages and the response format.
+    :param file_path: SQLite file of the cache
+    :param ttl: Seconds after which a completion is expired (0 - never)
+    :param max_entries: Maximum number of completions, the least recently used ones are evicted (0 - unlimited)
+    :param bypass: If true, completions are not read from the cache, but new ones are still stored
+    """
+
+    def __init__(self, file_path: str, ttl: float = 0, max_entries: int = 0, bypass: bool = False) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, model TEXT, content TEXT, created_at REAL, accessed_at REAL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS completions_accessed_at ON completions (accessed_at)"
+        )
+        self._connection.commit()
+        self._entries = self._connection.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    @staticmethod
+    def create_key(model: str, messages: List[Dict[str, str]], response_format: Optional[Dict[str, Any]]) -> str:
+        data = json.dumps([model, messages, response_format], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if self.bypass:
+            self._count("misses")
+            return None
+
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row and (not self.ttl or time.time() - row[1] < self.ttl):
+                self._connection.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self._connection.commit()
+                self.stats["hits"] += 1
+                return row[0]
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, model: str, content: str) -> None:
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO completions (key, model, content, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now)
+            )
+            if cursor.rowcount:
+                self._entries += 1
+            else:
+                self._connection.execute(
+                    "UPDATE completions SET content = ?, created_at = ?, accessed_at = ? WHERE key = ?",
+                    (content, now, now, key)
+                )
+            self.stats["stored"] += 1
+
+            # Evict the least recently used completions
+            if self.max_entries and self._entries > self.max_entries:
+                evicted = self._connection.execute(
+                    "DELETE FROM completions WHERE key IN "
+                    "(SELECT key FROM completions ORDER BY accessed_at LIMIT ?)",
+                    (self._entries - self.max_entries,)
+                ).rowcount
+                self._entries -= evicted
+                self.stats["evicted"] += evicted
+
+            self._connection.commit()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def log_stats(self) -> None:
+        logger.info(
+            f"LLM completion cache: hits {self.stats['hits']}, misses {self.stats['misses']}, "
+            f"stored {self.stats['stored']}, evicted {self.stats['evicted']}"
+        )
+
+
+def get_cache() -> Optional[CompletionCache]:
+    global _CACHE
+
+    settings = SETTINGS['openai']['cache']
+    if not settings['file']:
+        return None
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = CompletionCache(
+                file_path=settings['file'],
+                ttl=settings['ttl'],
+                max_entries=settings['max_entries'],
+                bypass=settings['bypass']
+            )
+        return _CACHE
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 
 from job_applier.models.base import Base
@@ -15,3 +17,35 @@ if DATABASE_USE:
 def init_db():
     if DATABASE_USE:
         Base.metadata.create_all(bind=engine)
+        add_missing_columns()
+        add_missing_indexes()
+
+
+def add_missing_columns():
+    # Tables created by an older version are not altered by create_all,
+    # so new nullable columns are added to them here
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logging.info(f"Column {column.name} is added to the table {table.name}.")
+
+
+def add_missing_indexes():
+    # Indexes declared after tables were created are not added by create_all either
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            try:
+                index.create(bind=engine)
+                logging.info(f"Index {index.name} is added to the table {table.name}.")
+            except Exception as e:
+                logging.error(f"Index {index.name} is not added to the table {table.name}: {e}")
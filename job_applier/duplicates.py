@@ -0,0 +1,85 @@
+import logging
+from typing import Optional
+
+import numpy as np
+import sqlalchemy
+from sqlalchemy.exc import SQLAlchemyError
+
+from job_applier.databese import Session
+from job_applier.models.applicant import Applicant
+from job_applier.models.job import Job, JobBucket, normalize_text
+from job_applier.settings import SETTINGS
+from job_applier.utils.minhash import MinHasher, get_bands, estimate_similarity
+
+# 32 bands of 4 values make jobs with similarity above ~0.5 likely candidates,
+# candidates are checked by the threshold from settings
+MIN_HASHER = MinHasher(permutations=128, shingle_size=3)
+BANDS = 32
+
+
+def link_near_duplicate(job: Job) -> Optional[int]:
+    """
+    Adds the saved job to the LSH index of descriptions and links it to the original job
+    if the index contains a job with almost the same description.
+    Jobs with unchanged descriptions are not indexed again.
+    :param job: The saved job
+    :return: ID of the original job, None if the job is original
+    """
+
+    if not job.id or not job.description:
+        return job.duplicate_of_id
+
+    signature = MIN_HASHER.signature(normalize_text(job.description))
+    if signature is None:
+        return job.duplicate_of_id
+    minhash = signature.tobytes()
+    if job.minhash == minhash:
+        return job.duplicate_of_id
+
+    buckets = get_bands(signature, BANDS)
+    threshold = SETTINGS['job']['near_duplicates']['threshold']
+
+    with Session() as session:
+        try:
+            candidate_ids = session.query(JobBucket.job_id).filter(
+                JobBucket.job_id != job.id,
+                sqlalchemy.or_(*(
+                    sqlalchemy.and_(JobBucket.band == band, JobBucket.bucket == bucket)
+                    for band, bucket in enumerate(buckets)
+                ))
+            ).distinct()
+
+            original_id = None
+            best_similarity = threshold
+            candidates = session.query(Job.id, Job.minhash, Job.duplicate_of_id).filter(Job.id.in_(candidate_ids))
+            for candidate_id, candidate_minhash, candidate_original_id in candidates:
+                similarity = estimate_similarity(signature, np.frombuffer(candidate_minhash, dtype=np.uint32))
+                candidate_original_id = candidate_original_id or candidate_id
+                if similarity >= best_similarity and candidate_original_id != job.id:
+                    original_id = candidate_original_id
+                    best_similarity = similarity
+
+            session.query(JobBucket).filter(JobBucket.job_id == job.id).delete()
+            session.add_all(JobBucket(job_id=job.id, band=band, bucket=bucket) for band, bucket in enumerate(buckets))
+            session.execute(
+                sqlalchemy.update(Job).where(Job.id == job.id).values(minhash=minhash, duplicate_of_id=original_id)
+            )
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while indexing job description: {e}")
+            return job.duplicate_of_id
+        except Exception as e:
+            logging.error(f"Unexpected error while indexing job description: {e}")
+            return job.duplicate_of_id
+
+    job.minhash = minhash
+    job.duplicate_of_id = original_id
+    if original_id:
+        logging.info(f"Job {job.source}/{job.source_id} is a near-duplicate of the job with ID {original_id} "
+                     f"(similarity {best_similarity:.2f}).")
+    return original_id
+
+
+def is_original(job: Job, applicant: Applicant) -> bool:
+    return job.duplicate_of_id is None
@@ -0,0 +1,160 @@
+import threading
+import time
+from typing import Optional, List, Dict, Any
+
+import openai
+from openai import OpenAI
+
+from job_applier.completion_cache import CompletionCache, get_cache
+from job_applier.log import logger
+from job_applier.settings import SETTINGS
+from job_applier.utils.rate_limit import TokenBucket, get_backoff
+
+# Errors after which the request is sent again
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError,
+                    openai.InternalServerError)
+
+# Approximate number of characters in one token, used to estimate tokens before the request
+CHARS_PER_TOKEN = 4
+
+_GATEWAY: Optional["LLMGateway"] = None
+_GATEWAY_LOCK = threading.Lock()
+
+
+class LLMGateway:
+    """
+    Gateway for all requests to the LLM API.
+    Keeps one pooled client shared by all threads and throttles requests
+    by requests per minute and tokens per minute, requests hitting the rate limit are retried with backoff.
+    :param model: The model used by default
+    :param requests_per_minute: Maximum number of requests per minute (0 - unlimited)
+    :param tokens_per_minute: Maximum number of tokens per minute (0 - unlimited)
+    :param expected_completion_tokens: Number of completion tokens reserved for a request before its usage is known
+    :param retry_attempts: Number of retries of a request
+    :param backoff: Base seconds of the exponential backoff between retries
+    :param max_backoff: Maximum seconds between retries
+    :param cache: The cache of completions, cached completions are not requested again
+    """
+
+    def __init__(self, model: str, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 expected_completion_tokens: int = 0, retry_attempts: int = 0, backoff: float = 1,
+                 max_backoff: float = 60, cache: Optional[CompletionCache] = None) -> None:
+        self.model = model
+        self.cache = cache
+        self.requests_bucket = TokenBucket(rate=requests_per_minute / 60, capacity=requests_per_minute)
+        self.tokens_bucket = TokenBucket(rate=tokens_per_minute / 60, capacity=tokens_per_minute)
+        self.expected_completion_tokens = expected_completion_tokens
+        self.retry_attempts = retry_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.client = OpenAI(max_retries=0)
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "LLMGateway":
+        return cls(
+            model=settings['version'],
+            requests_per_minute=settings['rate_limit']['requests_per_minute'],
+            tokens_per_minute=settings['rate_limit']['tokens_per_minute'],
+            expected_completion_tokens=settings['rate_limit']['expected_completion_tokens'],
+            retry_attempts=settings['retry']['attempts'],
+            backoff=settings['retry']['backoff'],
+            max_backoff=settings['retry']['max_backoff'],
+            cache=get_cache(),
+        )
+
+    def complete(self, messages: List[Dict[str, str]], response_format: Optional[Dict[str, Any]] = None,
+                 model: Optional[str] = None) -> Optional[str]:
+        """
+        Returns the cached completion or sends the chat completion request.
+        :param messages: The messages of the chat
+        :param response_format: The format of the response, text by default
+        :param model: The model, the gateway model by default
+        :return: The content of the first choice, None if the response does not contain it
+        """
+
+        model = model or self.model
+
+        if self.cache:
+            cache_key = self.cache.create_key(model, messages, response_format)
+            content = self.cache.get(cache_key)
+            if content is not None:
+                return content
+
+        content = self.request(messages, response_format, model)
+
+        if self.cache and content is not None:
+            self.cache.set(cache_key, model, content)
+
+        return content
+
+    def request(self, messages: List[Dict[str, str]], response_format: Optional[Dict[str, Any]],
+                model: str) -> Optional[str]:
+        reserved_tokens = estimate_tokens(messages) + self.expected_completion_tokens
+
+        attempt = 0
+        while True:
+            self.requests_bucket.acquire()
+            self.tokens_bucket.acquire(reserved_tokens)
+            try:
+                chat = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    response_format=response_format or {"type": "text"},
+                )
+                break
+            except RETRYABLE_ERRORS as e:
+                # The failed attempt did not use its tokens, they are reserved again by the next attempt
+                self.tokens_bucket.consume(-reserved_tokens)
+                if attempt >= self.retry_attempts:
+                    raise
+                delay = get_retry_after(e)
+                if delay is None:
+                    delay = get_backoff(attempt, self.backoff, self.max_backoff)
+                attempt += 1
+                logger.warning(f"LLM request failed ({type(e).__name__}), retry {attempt}/{self.retry_attempts} "
+                               f"in {delay:.1f}s")
+                time.sleep(delay)
+
+        # Correct the reserved tokens by the real usage
+        if chat.usage:
+            self.tokens_bucket.consume(chat.usage.total_tokens - reserved_tokens)
+
+        if (not chat.choices
+                or not hasattr(chat.choices[0], "message")
+                or not hasattr(chat.choices[0].message, "content")):
+            return None
+
+        return chat.choices[0].message.content
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(len(message.get("content") or "") for message in messages) // CHARS_PER_TOKEN + 1
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def get_gateway() -> LLMGateway:
+    global _GATEWAY
+
+    with _GATEWAY_LOCK:
+        if _GATEWAY is None:
+            _GATEWAY = LLMGateway.from_settings(SETTINGS['openai'])
+        return _GATEWAY
+
+
+def complete(messages: List[Dict[str, str]], response_format: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    return get_gateway().complete(messages, response_format=response_format)
+
+
+def log_stats() -> None:
+    if _GATEWAY and _GATEWAY.cache:
+        _GATEWAY.cache.log_stats()
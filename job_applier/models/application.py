@@ -1,7 +1,7 @@
 import logging
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Callable
 
 import sqlalchemy
 from sqlalchemy.exc import SQLAlchemyError
@@ -12,11 +12,15 @@ from job_applier.log import log
 from job_applier.models.applicant import Applicant
 from job_applier.models.base import Base
 from job_applier.models.cover_letter import CoverLetterModel
+from job_applier.models.documents import ApplicationDocuments, create_documents
 from job_applier.models.email import EmailModel
 from job_applier.models.job import Job
 from job_applier.models.resume import ResumeModel
 from job_applier.settings import SETTINGS
 
+# Filters checked before texts of the application are generated, the job is skipped if a filter returns false
+APPLICATION_FILTERS: List[Callable[[Job, Applicant], bool]] = []
+
 
 @dataclass
 class Application(Base):
@@ -42,24 +46,44 @@ class Application(Base):
 
     def __post_init__(self) -> None:
 
+        documents = self.create_documents()
+
         if not self.cover_letter:
-            self.cover_letter = CoverLetterModel(job=self.job, applicant=self.applicant)
+            self.cover_letter = CoverLetterModel(job=self.job, applicant=self.applicant, text=documents.cover_letter)
             if self.email and self.cover_letter.file_path not in self.email.attachments:
                 self.email.attachments.append(self.cover_letter.file_path)
 
         if not self.resume:
-            self.resume = ResumeModel(job=self.job, applicant=self.applicant)
+            self.resume = ResumeModel(job=self.job, applicant=self.applicant, text=documents.resume)
             if self.email and self.resume.file_path not in self.email.attachments:
                 self.email.attachments.append(self.resume.file_path)
 
         if not self.email:
-            self.email = EmailModel(job=self.job, applicant=self.applicant)
+            self.email = EmailModel(job=self.job, applicant=self.applicant, text=documents.email)
             self.email.attachments.append(self.cover_letter.file_path)
             self.email.attachments.append(self.resume.file_path)
 
         if not self.applied_at and self.applied:
             self.applied_at = datetime.now()
 
+    def create_documents(self) -> ApplicationDocuments:
+        """
+        Generates missing texts by one combined request if it is enabled.
+        Texts which are not generated are created by their models separately.
+        """
+
+        if not SETTINGS['openai']['create_applicant_documents']['enabled']:
+            return ApplicationDocuments()
+
+        documents = create_documents(
+            job=self.job,
+            applicant=self.applicant,
+            email=not self.email and not SETTINGS['openai']['create_applicant_email_template']['enabled'],
+            cover_letter=not self.cover_letter and not self.applicant.cover_letter_file_path,
+            resume=not self.resume and not self.applicant.resume_file_path
+        )
+        return documents or ApplicationDocuments()
+
     @property
     def applied(self) -> bool:
         return self._applied
@@ -129,6 +153,20 @@ def save_application(application: Application) -> Optional[Application]:
             logging.error(f"Unexpected error while saving or updating application: {e}")
 
 
+def save_application_applied(application_id: int, applied_at: datetime) -> None:
+    with Session() as session:
+        try:
+            session.query(Application).filter_by(id=application_id).update(
+                {Application._applied: True, Application.applied_at: applied_at}
+            )
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while marking application {application_id} as applied: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while marking application {application_id} as applied: {e}")
+
+
 def check_application(application: Application = None, job: Job = None, applicant: Applicant = None) -> Optional[
     Application]:
     job = job or application.job
@@ -149,3 +187,25 @@ def check_application(application: Application = None, job: Job = None, applican
             logging.error(f"Unexpected error while checking application: {e}")
 
     return None
+
+
+def check_eligibility(job: Job, applicant: Applicant) -> Optional[str]:
+    """
+    Runs cheap checks before any text or file of the application is generated.
+    :param job: The job
+    :param applicant: The applicant
+    :return: The reason why the application is not created, None if the job is eligible
+    """
+
+    if SETTINGS['job']['require_email'] and not job.email:
+        return "the job has no email to send the application"
+
+    for application_filter in APPLICATION_FILTERS:
+        if not application_filter(job, applicant):
+            return f"the job is filtered by {getattr(application_filter, '__name__', application_filter)}"
+
+    existing_application = check_application(job=job, applicant=applicant)
+    if existing_application:
+        return f"the applicant already applied at {existing_application.applied_at}"
+
+    return None
@@ -0,0 +1,126 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Dict, Iterable
+
+import sqlalchemy
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Mapped, mapped_column
+
+from job_applier.databese import Session, DATABASE_USE
+from job_applier.models.base import Base
+
+
+class BatchRequestStatus:
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    USED = "used"
+
+
+@dataclass
+class Batch(Base):
+    __tablename__ = "batches"
+
+    id: Mapped[str] = mapped_column(sqlalchemy.String, primary_key=True)
+    status: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    input_file: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    output_file: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+
+
+@dataclass
+class BatchRequest(Base):
+    """
+    Request of a batch, identified by the hash of its model, messages and response format,
+    so the same request of the next run is found and its result is reused.
+    """
+
+    __tablename__ = "batch_requests"
+
+    key: Mapped[str] = mapped_column(sqlalchemy.String, primary_key=True)
+    batch_id: Mapped[str] = mapped_column(sqlalchemy.ForeignKey("batches.id"), nullable=False)
+    job_source: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    job_source_id: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    kind: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    status: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    content: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+
+
+def save_batch(batch: Batch, requests: Iterable[BatchRequest] = ()) -> None:
+    if not DATABASE_USE:
+        return
+    now = datetime.now()
+    with Session() as session:
+        try:
+            for item in [batch, *requests]:
+                item.created_at = item.created_at or now
+                item.updated_at = now
+                session.merge(item)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while saving batch {batch.id}: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while saving batch {batch.id}: {e}")
+
+
+def save_batch_requests(requests: Iterable[BatchRequest]) -> None:
+    if not DATABASE_USE:
+        return
+    now = datetime.now()
+    with Session() as session:
+        try:
+            for request in requests:
+                request.updated_at = now
+                session.merge(request)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while saving batch requests: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while saving batch requests: {e}")
+
+
+def get_batches(ids: List[str]) -> Dict[str, Batch]:
+    if not DATABASE_USE or not ids:
+        return {}
+    with Session() as session:
+        try:
+            batches = session.query(Batch).filter(Batch.id.in_(ids)).all()
+            return {batch.id: batch for batch in batches}
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while getting batches: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while getting batches: {e}")
+    return {}
+
+
+def get_batch_requests(keys: Optional[List[str]] = None, statuses: Optional[List[str]] = None) \
+        -> Dict[str, BatchRequest]:
+    """
+    Returns saved batch requests by keys.
+    :param keys: Keys of requests, None - all requests
+    :param statuses: Statuses of requests, None - any status
+    """
+
+    if not DATABASE_USE or keys == []:
+        return {}
+    with Session() as session:
+        try:
+            query = session.query(BatchRequest)
+            if keys is not None:
+                query = query.filter(BatchRequest.key.in_(keys))
+            if statuses is not None:
+                query = query.filter(BatchRequest.status.in_(statuses))
+            return {request.key: request for request in query.all()}
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while getting batch requests: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while getting batch requests: {e}")
+    return {}
@@ -1,15 +1,19 @@
 import os
 import tempfile
 from dataclasses import dataclass
-from typing import Optional
-
-from docxtpl import DocxTemplate
-from openai import OpenAI
+from typing import Optional, Dict, Any, TYPE_CHECKING
 
+from job_applier.artifacts import get_artifact_store, create_owner
+from job_applier.llm import complete
 from job_applier.log import log
 from job_applier.models.file import FileModel
+from job_applier.prompts import create_messages
 from job_applier.settings import SETTINGS
-from job_applier.utils.convert_docx_to_pdf import libreoffice_available, convert_to_pdf_with_libreoffice
+from job_applier.utils.convert_docx_to_pdf import libreoffice_available, convert_to_pdf
+from job_applier.utils.docx_render import render_file
+
+if TYPE_CHECKING:
+    from job_applier import Applicant, Job
 
 
 @dataclass
@@ -21,29 +25,7 @@ class CoverLetterModel(FileModel):
             return None
 
         # Generate cover letter text
-        developer_content = SETTINGS["openai"]["create_applicant_cover_letter"]["developer_content"]
-        developer_content = developer_content.format(job=self.job, applicant=self.applicant)
-        user_content = SETTINGS["openai"]["create_applicant_cover_letter"]["user_content"]
-        user_content = user_content.format(job=self.job, applicant=self.applicant)
-
-        client = OpenAI()
-        chat = client.chat.completions.create(
-            model=SETTINGS["openai"]["version"],
-            messages=[
-                {"role": "developer", "content": developer_content},
-                {"role": "user", "content": user_content},
-            ],
-            response_format={
-                "type": "text"
-            },
-        )
-
-        if (not chat.choices
-                or not hasattr(chat.choices[0], "message")
-                or not hasattr(chat.choices[0].message, "content")):
-            return None
-
-        return chat.choices[0].message.content
+        return complete(**create_cover_letter_request(job=self.job, applicant=self.applicant))
 
     def create_file(self) -> Optional[str]:
 
@@ -61,11 +43,6 @@ class CoverLetterModel(FileModel):
             log_dir = tempfile.gettempdir()
         log_file_name = f"{self.applicant.first_name.capitalize()}_{self.applicant.last_name.capitalize()}_Cover_Letter_{self.job.source_id}"
 
-        result_files = (
-            os.path.join(log_dir, f"{log_file_name}{template_file_ext}"),
-            os.path.join(log_dir, f"{log_file_name}.pdf")
-        )
-
         # Fill and save cover letter with template ext
         data = {
             'text': self.text,
@@ -73,13 +50,22 @@ class CoverLetterModel(FileModel):
             'applicant': self.applicant
         }
 
-        doc = DocxTemplate(template_file_path)
-        doc.render(data)
-        doc.save(result_files[0])
+        # Reuse the document with the same template and data
+        artifact_store = get_artifact_store()
+        if artifact_store:
+            return artifact_store.create_file(
+                template_file_path, data, log_file_name, owner=create_owner("cover_letter", self.job, self.applicant)
+            )
+
+        result_files = (
+            os.path.join(log_dir, f"{log_file_name}{template_file_ext}"),
+            os.path.join(log_dir, f"{log_file_name}.pdf")
+        )
+        render_file(template_file_path, data, result_files[0])
 
         # Save cover letter with PDF ext
         if libreoffice_available():
-            convert_to_pdf_with_libreoffice(result_files[0], result_files[1])
+            convert_to_pdf(result_files[0], result_files[1])
             cover_letter_result_file = result_files[1]
         else:
             cover_letter_result_file = result_files[0]
@@ -87,6 +73,12 @@ class CoverLetterModel(FileModel):
         return cover_letter_result_file
 
 
+def create_cover_letter_request(job: "Job", applicant: "Applicant") -> Dict[str, Any]:
+    return {
+        "messages": create_messages("create_applicant_cover_letter", job=job, applicant=applicant)
+    }
+
+
 def log_cover_letter(cover_letter: CoverLetterModel) -> None:
     data = {
         'job_applicant': f"{cover_letter.applicant.first_name} {cover_letter.applicant.last_name}",
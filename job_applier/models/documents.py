@@ -0,0 +1,114 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, TYPE_CHECKING
+
+from job_applier.llm import complete
+from job_applier.prompts import create_messages
+from job_applier.settings import SETTINGS
+
+if TYPE_CHECKING:
+    from job_applier import Applicant, Job
+
+
+@dataclass
+class ApplicationDocuments:
+    email: Optional[str] = None
+    cover_letter: Optional[str] = None
+    resume: Optional[str] = None
+
+
+def create_json_schema(value: Any) -> Dict[str, Any]:
+    """
+    Creates the strict JSON schema of the value, used to make the model keep the structure of applicant data.
+    :param value: The sample value
+    :return: The JSON schema
+    """
+
+    if isinstance(value, dict):
+        return {
+            "type": "object",
+            "properties": {key: create_json_schema(item) for key, item in value.items()},
+            "required": list(value.keys()),
+            "additionalProperties": False,
+        }
+    if isinstance(value, list):
+        return {"type": "array", "items": create_json_schema(value[0] if value else "")}
+    if isinstance(value, bool):
+        return {"type": "boolean"}
+    if isinstance(value, int):
+        return {"type": "integer"}
+    if isinstance(value, float):
+        return {"type": "number"}
+    if value is None:
+        return {"type": ["string", "null"]}
+    return {"type": "string"}
+
+
+def create_response_format(email: bool, cover_letter: bool, resume: bool) -> Dict[str, Any]:
+    properties = {}
+    if email:
+        properties["email"] = {"type": "string"}
+    if cover_letter:
+        properties["cover_letter"] = {"type": "string"}
+    if resume:
+        properties["resume"] = create_json_schema({"applicant": SETTINGS["applicant"]})
+
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "application_documents",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties.keys()),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def create_documents(job: "Job", applicant: "Applicant", email: bool = True, cover_letter: bool = True,
+                     resume: bool = True) -> Optional[ApplicationDocuments]:
+    """
+    Generates the email, the cover letter and the tailored resume by one structured output request.
+    :param job: The job
+    :param applicant: The applicant
+    :param email: If true, the email text is generated
+    :param cover_letter: If true, the cover letter text is generated
+    :param resume: If true, the resume JSON is generated
+    :return: Generated texts, None if the request failed and texts must be generated separately
+    """
+
+    if not (email or cover_letter or resume):
+        return ApplicationDocuments()
+
+    try:
+        content = complete(**create_documents_request(job, applicant, email, cover_letter, resume))
+        return parse_documents(content)
+    except Exception as e:
+        logging.error(f"Unexpected error while generating documents for job {job.source_id}: {e}")
+        return None
+
+
+def create_documents_request(job: "Job", applicant: "Applicant", email: bool = True, cover_letter: bool = True,
+                             resume: bool = True) -> Dict[str, Any]:
+    return {
+        "messages": create_messages(
+            "create_applicant_documents",
+            job=job,
+            applicant=applicant,
+            json=json.dumps({"applicant": SETTINGS["applicant"]})
+        ),
+        "response_format": create_response_format(email, cover_letter, resume),
+    }
+
+
+def parse_documents(content: str) -> ApplicationDocuments:
+    data = json.loads(content)
+    return ApplicationDocuments(
+        email=data.get("email"),
+        cover_letter=data.get("cover_letter"),
+        resume=json.dumps(data["resume"]) if "resume" in data else None,
+    )
@@ -1,10 +1,13 @@
 import os
 from dataclasses import dataclass, field
 
-from typing import Optional, TYPE_CHECKING
+from typing import Optional, Dict, Any, List, Tuple, TYPE_CHECKING
 
-import yagmail
-from openai import OpenAI
+from job_applier.llm import complete
+from job_applier.prompts import create_messages
+from job_applier.settings import SETTINGS
+from job_applier.utils.mime import create_message, get_attachment_cache
+from job_applier.utils.smtp_pool import SmtpPool, get_pool
 
 if TYPE_CHECKING:
     from job_applier import Applicant, Job
@@ -34,45 +37,50 @@ class EmailModel:
 
     def create_text(self) -> Optional[str]:
 
-        from job_applier import SETTINGS
-
-        developer_content = SETTINGS["openai"]["create_applicant_email"]["developer_content"]
-        developer_content = developer_content.format(job=self.job, applicant=self.applicant)
-        user_content = SETTINGS["openai"]["create_applicant_email"]["user_content"]
-        user_content = user_content.format(job=self.job, applicant=self.applicant)
-
-        client = OpenAI()
-        chat = client.chat.completions.create(
-            model=SETTINGS["openai"]["version"],
-            messages=[
-                {"role": "developer", "content": developer_content},
-                {"role": "user", "content": user_content},
-            ],
-            response_format={
-                "type": "text"
-            },
-        )
+        from job_applier.models.email_template import get_email_templates
 
-        if (not chat.choices
-                or not hasattr(chat.choices[0], "message")
-                or not hasattr(chat.choices[0].message, "content")):
-            return None
+        # Emails of jobs with similar titles are filled from the same template
+        templates = get_email_templates()
+        if templates:
+            text = templates.fill(job=self.job, applicant=self.applicant)
+            if text:
+                return text
 
-        return chat.choices[0].message.content
+        return complete(**create_email_request(job=self.job, applicant=self.applicant))
 
-    def send(self) -> bool:
-        port = os.getenv("EMAIL_PORT")
-        smtp_ssl = True if os.getenv("EMAIL_PORT") == "465" else False
-        yag = yagmail.SMTP(
-            user=os.getenv("EMAIL_USER"),
-            password=os.getenv("EMAIL_PASSWORD"),
-            host=os.getenv("EMAIL_HOST"),
-            port=port,
-            smtp_ssl=smtp_ssl
-        )
-        return yag.send(
+    def create_message(self) -> Tuple[List[str], str]:
+        # Static attachments, like the applicant resume, are encoded once and reused by all messages
+        message = create_message(
+            sender=os.getenv("EMAIL_USER"),
             to=self.to,
             subject=self.subject,
-            contents=self.text,
-            attachments=self.attachments
+            text=self.text,
+            attachments=self.attachments,
+            cache=get_attachment_cache()
         )
+        return [self.to], message
+
+    def send(self) -> bool:
+        recipients, message = self.create_message()
+        get_transport().send(recipients, message)
+        return True
+
+
+def get_transport() -> SmtpPool:
+    settings = SETTINGS['email']
+    return get_pool(
+        host=os.getenv("EMAIL_HOST"),
+        port=int(os.getenv("EMAIL_PORT") or 465),
+        user=os.getenv("EMAIL_USER"),
+        password=os.getenv("EMAIL_PASSWORD"),
+        size=settings['connections'],
+        timeout=settings['timeout'],
+        starttls=settings['starttls'],
+        idle_timeout=settings['idle_timeout']
+    )
+
+
+def create_email_request(job: "Job", applicant: "Applicant") -> Dict[str, Any]:
+    return {
+        "messages": create_messages("create_applicant_email", job=job, applicant=applicant)
+    }
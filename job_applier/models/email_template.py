@@ -0,0 +1,133 @@
+import logging
+import re
+import threading
+from difflib import SequenceMatcher
+from typing import Optional, Dict, Any, Tuple, TYPE_CHECKING
+
+from job_applier.llm import complete
+from job_applier.log import logger
+from job_applier.models.job import normalize_text
+from job_applier.prompts import create_messages
+from job_applier.settings import SETTINGS
+
+if TYPE_CHECKING:
+    from job_applier import Applicant, Job
+
+COMPANY_PLACEHOLDER = "[COMPANY]"
+POSITION_PLACEHOLDER = "[POSITION]"
+PLACEHOLDER_PATTERN = re.compile(r"\[[A-Z][A-Z _]*]")
+
+_TEMPLATES: Optional["EmailTemplates"] = None
+_TEMPLATES_LOCK = threading.Lock()
+
+
+class EmailTemplates:
+    """
+    Email texts generated once for every cluster of jobs with similar normalized titles.
+    A template contains placeholders of the company and the position which are filled for every job locally.
+    :param similarity: Minimum similarity of a normalized title to the title of the cluster (from 0 to 1)
+    """
+
+    def __init__(self, similarity: float) -> None:
+        self.similarity = similarity
+        self.templates: Dict[Tuple[str, str], Optional[str]] = {}
+        self.stats = {"clusters": 0, "filled": 0, "fallbacks": 0}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def find_cluster(self, applicant_email: str, title: str) -> Tuple[str, str]:
+        best_cluster = (applicant_email, title)
+        best_similarity = self.similarity
+        for cluster in self._locks:
+            if cluster[0] != applicant_email:
+                continue
+            similarity = SequenceMatcher(None, title, cluster[1]).ratio()
+            if similarity >= best_similarity:
+                best_cluster = cluster
+                best_similarity = similarity
+        return best_cluster
+
+    def fill(self, job: "Job", applicant: "Applicant") -> Optional[str]:
+        """
+        Returns the email text of the cluster of the job filled for the job.
+        The template of the cluster is generated by the first job of the cluster.
+        :return: The email text, None if it must be generated for the job
+        """
+
+        title = normalize_text(job.title)
+        if not title:
+            self._count("fallbacks")
+            return None
+
+        with self._lock:
+            cluster = self.find_cluster(applicant.email, title)
+            cluster_lock = self._locks.setdefault(cluster, threading.Lock())
+
+        with cluster_lock:
+            if cluster not in self.templates:
+                self.templates[cluster] = create_template(job, applicant)
+                self._count("clusters")
+                logger.info(f"Email template is created for jobs like '{cluster[1]}'.")
+
+        text = fill_template(self.templates[cluster], job)
+        self._count("filled" if text else "fallbacks")
+        return text
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def log_stats(self) -> None:
+        logger.info(
+            f"Email templates: clusters {self.stats['clusters']}, filled {self.stats['filled']}, "
+            f"generated for jobs {self.stats['fallbacks']}"
+        )
+
+
+def create_email_template_request(job: "Job", applicant: "Applicant") -> Dict[str, Any]:
+    return {
+        "messages": create_messages("create_applicant_email_template", job=job, applicant=applicant)
+    }
+
+
+def create_template(job: "Job", applicant: "Applicant") -> Optional[str]:
+    try:
+        template = complete(**create_email_template_request(job=job, applicant=applicant))
+    except Exception as e:
+        logging.error(f"Unexpected error while generating email template: {e}")
+        return None
+
+    if not template or POSITION_PLACEHOLDER not in template:
+        logger.warning(f"Email template for the job {job.source_id} has no position placeholder and is not used.")
+        return None
+    return template
+
+
+def fill_template(template: Optional[str], job: "Job") -> Optional[str]:
+    if not template or (COMPANY_PLACEHOLDER in template and not job.business):
+        return None
+
+    text = template.replace(COMPANY_PLACEHOLDER, job.business or "").replace(POSITION_PLACEHOLDER, job.title)
+
+    # Placeholders which can not be filled locally
+    if PLACEHOLDER_PATTERN.search(text):
+        return None
+    return text
+
+
+def get_email_templates() -> Optional[EmailTemplates]:
+    global _TEMPLATES
+
+    settings = SETTINGS["openai"]["create_applicant_email_template"]
+    if not settings["enabled"]:
+        return None
+
+    with _TEMPLATES_LOCK:
+        if _TEMPLATES is None:
+            _TEMPLATES = EmailTemplates(similarity=settings["similarity"])
+        return _TEMPLATES
+
+
+def log_stats() -> None:
+    if _TEMPLATES:
+        _TEMPLATES.log_stats()
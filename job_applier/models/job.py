@@ -1,19 +1,33 @@
 import logging
+import re
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from functools import partial
+from typing import List, Optional, Dict, Iterator, Iterable, Tuple, Union
 
 import sqlalchemy
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Mapped, mapped_column
 
-from job_applier.databese import Session
+from job_applier.databese import Session, DATABASE_USE
 from job_applier.log import log
 from job_applier.models.base import Base
 from job_applier.settings import SETTINGS
+from job_applier.utils.concurrency import iterate_concurrently
 
 JOB_FINDERS: List = []
+JOBS_QUEUE_SIZE = 100
+
+# Dialects supporting INSERT ... ON CONFLICT DO UPDATE, jobs are saved by one statement there
+UPSERT_DIALECTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+# Legal forms are skipped when company names of different sources are compared
+COMPANY_STOP_WORDS = {"inc", "incorporated", "ltd", "limited", "llc", "llp", "corp", "corporation", "co", "company"}
 
 
 class SalaryType(Enum):
@@ -29,6 +43,7 @@ class Workspace(Enum):
 @dataclass
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (sqlalchemy.Index("jobs_source_source_id", "source", "source_id", unique=True),)
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     link: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
@@ -44,26 +59,164 @@ class Job(Base):
     salary_type: Mapped[Optional[SalaryType]] = mapped_column(sqlalchemy.Enum(SalaryType), nullable=True)
     workspace: Mapped[Optional[Workspace]] = mapped_column(sqlalchemy.Enum(Workspace), nullable=True)
     email: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    details_updated_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+    relevance: Mapped[Optional[float]] = mapped_column(sqlalchemy.Float, nullable=True)
+    minhash: Mapped[Optional[bytes]] = mapped_column(sqlalchemy.LargeBinary, nullable=True)
+    duplicate_of_id: Mapped[Optional[int]] = mapped_column(sqlalchemy.ForeignKey("jobs.id"), nullable=True)
+    condensed_description: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    condensed_description_key: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
     created_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
     updated_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
 
 
-def find_jobs() -> List[Job]:
-    jobs = []
+@dataclass
+class JobBucket(Base):
+    """
+    Bucket of the LSH index of job descriptions, jobs sharing a bucket of any band are near-duplicate candidates.
+    """
+
+    __tablename__ = "job_buckets"
+    __table_args__ = (sqlalchemy.Index("job_buckets_band_bucket", "band", "bucket"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    job_id: Mapped[int] = mapped_column(sqlalchemy.ForeignKey("jobs.id"), nullable=False, index=True)
+    band: Mapped[int] = mapped_column(sqlalchemy.Integer, nullable=False)
+    bucket: Mapped[int] = mapped_column(sqlalchemy.BigInteger, nullable=False)
+
+
+def find_jobs() -> Iterator[Job]:
+    """
+    Runs all registered finders in parallel and yields their jobs as soon as they are found.
+    Every finder gets the lists of all titles and locations to search for.
+    The same job posted on several sources is yielded only once.
+    """
+
+    titles = as_list(SETTINGS['job']['title'])
+    locations = as_list(SETTINGS['job']['location'])
+    producers = [partial(finder, titles, locations) for finder in JOB_FINDERS]
+
+    seen_keys: Dict[Tuple, str] = {}
+    for job in iterate_concurrently(producers, queue_size=JOBS_QUEUE_SIZE):
+        duplicate_source = find_duplicate_source(job, seen_keys)
+        if duplicate_source:
+            logging.info(f"Job {job.source}/{job.source_id} is skipped as a duplicate from {duplicate_source}.")
+            continue
+        yield job
+
+
+def as_list(value: Union[str, List[str], None]) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return [item for item in value if item]
+
+
+def normalize_text(text: Optional[str], stop_words: Iterable[str] = ()) -> str:
+    words = re.sub(r"[^a-z0-9]+", " ", (text or "").lower()).split()
+    return " ".join(word for word in words if word not in stop_words)
 
-    for finder in JOB_FINDERS:
-        jobs += finder(SETTINGS['job']['title'], SETTINGS['job']['location'])
 
-    return jobs
+def get_job_keys(job: Job) -> List[Tuple]:
+    title = normalize_text(job.title)
+    company = normalize_text(job.business, COMPANY_STOP_WORDS)
+    location = normalize_text(job.location)
+    email = (job.email or "").strip().lower()
+
+    keys = []
+    if title and company:
+        keys.append(("posting", company, title, location))
+    if title and email:
+        keys.append(("email", email, title))
+    return keys
+
+
+def find_duplicate_source(job: Job, seen_keys: Dict[Tuple, str]) -> Optional[str]:
+    """
+    Checks whether the same job was already found on another source and remembers the job keys.
+    Jobs of the same source are never duplicates, they are identified by source ID.
+    :param job: The job to check
+    :param seen_keys: Sources of the already found jobs by job keys
+    :return: The source where the job was already found, None if the job is new
+    """
+
+    keys = get_job_keys(job)
+    for key in keys:
+        source = seen_keys.get(key)
+        if source and source != job.source:
+            return source
+
+    for key in keys:
+        seen_keys.setdefault(key, job.source)
+    return None
 
 
 def log_jobs(jobs: List[Job]) -> None:
     log(SETTINGS['log']['jobs']['file'], jobs)
 
 
+def log_job(job: Job) -> None:
+    log(SETTINGS['log']['jobs']['file'], [job])
+
+
 def save_jobs(jobs: List[Job]) -> None:
-    for job in jobs:
-        save_job(job)
+    """
+    Inserts new jobs and updates existing ones by one statement per set of columns in one transaction.
+    Jobs are matched by the unique index of the source and the source ID, created_at is set only for new jobs.
+    Saved values, including IDs and columns saved by previous runs, are set back to jobs like save_job does.
+    If the database does not support the upsert, jobs are saved one by one.
+    """
+
+    if not jobs:
+        return
+
+    with Session() as session:
+        dialect = session.get_bind().dialect.name
+        if dialect not in UPSERT_DIALECTS:
+            for job in jobs:
+                save_job(job)
+            return
+
+        now = datetime.now()
+        jobs_by_key: Dict[Tuple[str, str], List[Job]] = {}
+        for job in jobs:
+            job.updated_at = now
+            jobs_by_key.setdefault((job.source, job.source_id), []).append(job)
+
+        # A statement can not update the same row twice, so the last job of a key is saved,
+        # jobs are inserted by one statement per set of columns
+        rows_by_columns: Dict[Tuple[str, ...], List[Dict]] = {}
+        for same_jobs in jobs_by_key.values():
+            row = {key: value for key, value in vars(same_jobs[-1]).items()
+                   if key not in ("_sa_instance_state", "id", "created_at")}
+            row["created_at"] = now
+            rows_by_columns.setdefault(tuple(sorted(row)), []).append(row)
+
+        try:
+            saved_rows = []
+            for columns, rows in rows_by_columns.items():
+                statement = UPSERT_DIALECTS[dialect](Job).values(rows)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[Job.source, Job.source_id],
+                    set_={column: statement.excluded[column] for column in columns
+                          if column not in ("source", "source_id", "created_at")}
+                ).returning(*Job.__table__.columns)
+                saved_rows.extend(session.execute(statement).mappings().all())
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while saving jobs, they are saved one by one: {e}")
+            for job in jobs:
+                save_job(job)
+            return
+        except Exception as e:
+            logging.error(f"Unexpected error while saving jobs: {e}")
+            return
+
+    for saved_row in saved_rows:
+        for job in jobs_by_key.get((saved_row["source"], saved_row["source_id"]), []):
+            for key, value in saved_row.items():
+                setattr(job, key, value)
 
 
 def save_job(job: Job) -> Optional[Job]:
@@ -93,6 +246,40 @@ def save_job(job: Job) -> Optional[Job]:
             logging.error(f"Unexpected error while saving or updating job: {e}")
 
 
+def save_jobs_relevance(jobs: List[Job]) -> None:
+    rows = [{"id": job.id, "relevance": job.relevance} for job in jobs if job.id]
+    if not rows:
+        return
+    with Session() as session:
+        try:
+            session.execute(sqlalchemy.update(Job), rows)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while saving relevance of jobs: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while saving relevance of jobs: {e}")
+
+
+def save_condensed_description(job: Job) -> None:
+    if not job.id:
+        return
+    with Session() as session:
+        try:
+            session.execute(
+                sqlalchemy.update(Job).where(Job.id == job.id).values(
+                    condensed_description=job.condensed_description,
+                    condensed_description_key=job.condensed_description_key
+                )
+            )
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while saving condensed description of job: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while saving condensed description of job: {e}")
+
+
 def get_job(source: str, source_id: str) -> Optional[Job]:
     with Session() as session:
         try:
@@ -102,3 +289,18 @@ def get_job(source: str, source_id: str) -> Optional[Job]:
             logging.error(f"Database error while getting job: {e}")
         except Exception as e:
             logging.error(f"Unexpected error while getting job: {e}")
+
+
+def get_jobs(source: str, source_ids: List[str]) -> Dict[str, Job]:
+    if not DATABASE_USE or not source_ids:
+        return {}
+    with Session() as session:
+        try:
+            jobs = session.query(Job).filter(Job.source == source, Job.source_id.in_(source_ids)).all()
+            return {job.source_id: job for job in jobs}
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while getting jobs: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while getting jobs: {e}")
+    return {}
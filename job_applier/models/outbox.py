@@ -0,0 +1,107 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+import sqlalchemy
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Mapped, mapped_column
+
+from job_applier.databese import Session, DATABASE_USE
+from job_applier.models.base import Base
+
+
+class OutboxStatus:
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+@dataclass
+class OutboxMessage(Base):
+    """
+    Composed email waiting to be sent, messages stay in the outbox until they are sent or fail permanently,
+    so messages not sent by an interrupted run are sent by the next one.
+    """
+
+    __tablename__ = "outbox"
+    __table_args__ = (sqlalchemy.Index("outbox_provider_status", "provider", "status", "next_attempt_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    application_id: Mapped[Optional[int]] = mapped_column(sqlalchemy.ForeignKey("applications.id"), nullable=True)
+    provider: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    recipients: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    message: Mapped[Optional[str]] = mapped_column(sqlalchemy.Text, nullable=True)
+    status: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    attempts: Mapped[int] = mapped_column(sqlalchemy.Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(sqlalchemy.String, nullable=True)
+    next_attempt_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+    created_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(sqlalchemy.DateTime, nullable=True)
+
+
+def save_outbox_message(message: OutboxMessage) -> Optional[OutboxMessage]:
+    if not DATABASE_USE:
+        return None
+    now = datetime.now()
+    with Session() as session:
+        try:
+            message.created_at = message.created_at or now
+            message.updated_at = now
+            message = session.merge(message)
+            session.commit()
+            session.refresh(message)
+            session.expunge(message)
+            return message
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while saving outbox message: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while saving outbox message: {e}")
+
+
+def get_outbox_messages(provider: str, due_at: datetime, limit: int) -> List[OutboxMessage]:
+    """
+    Returns pending messages of the provider which are due at the time, the oldest first.
+    """
+
+    if not DATABASE_USE:
+        return []
+    with Session() as session:
+        try:
+            messages = session.query(OutboxMessage).filter(
+                OutboxMessage.provider == provider,
+                OutboxMessage.status == OutboxStatus.PENDING,
+                OutboxMessage.next_attempt_at <= due_at
+            ).order_by(OutboxMessage.next_attempt_at, OutboxMessage.id).limit(limit).all()
+            session.expunge_all()
+            return messages
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while getting outbox messages: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while getting outbox messages: {e}")
+    return []
+
+
+def count_outbox_messages(statuses: List[str], provider: Optional[str] = None, application_id: Optional[int] = None,
+                          sent_since: Optional[datetime] = None) -> int:
+    if not DATABASE_USE:
+        return 0
+    with Session() as session:
+        try:
+            query = session.query(OutboxMessage).filter(OutboxMessage.status.in_(statuses))
+            if provider is not None:
+                query = query.filter(OutboxMessage.provider == provider)
+            if application_id is not None:
+                query = query.filter(OutboxMessage.application_id == application_id)
+            if sent_since is not None:
+                query = query.filter(OutboxMessage.sent_at >= sent_since)
+            return query.count()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logging.error(f"Database error while counting outbox messages: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error while counting outbox messages: {e}")
+    return 0
@@ -2,15 +2,19 @@ import json
 import os
 import tempfile
 from dataclasses import dataclass
-from typing import Optional
-
-from docxtpl import DocxTemplate
-from openai import OpenAI
+from typing import Optional, Dict, Any, TYPE_CHECKING
 
+from job_applier.artifacts import get_artifact_store, create_owner
+from job_applier.llm import complete
 from job_applier.log import log
 from job_applier.models.file import FileModel
+from job_applier.prompts import create_messages
 from job_applier.settings import SETTINGS
-from job_applier.utils.convert_docx_to_pdf import libreoffice_available, convert_to_pdf_with_libreoffice
+from job_applier.utils.convert_docx_to_pdf import libreoffice_available, convert_to_pdf
+from job_applier.utils.docx_render import render_file
+
+if TYPE_CHECKING:
+    from job_applier import Applicant, Job
 
 
 @dataclass
@@ -21,33 +25,7 @@ class ResumeModel(FileModel):
         if self.applicant.resume_file_path:
             return None
 
-        developer_content = SETTINGS["openai"]["create_applicant_resume"]["developer_content"]
-        developer_content = developer_content.format(job=self.job, applicant=self.applicant)
-        user_content = SETTINGS["openai"]["create_applicant_resume"]["user_content"]
-        user_content = user_content.format(
-            job=self.job,
-            applicant=self.applicant,
-            json=json.dumps({"applicant": SETTINGS["applicant"]})
-        )
-
-        client = OpenAI()
-        chat = client.chat.completions.create(
-            model=SETTINGS["openai"]["version"],
-            messages=[
-                {"role": "developer", "content": developer_content},
-                {"role": "user", "content": user_content},
-            ],
-            response_format={
-                "type": "text"
-            },
-        )
-
-        if (not chat.choices
-                or not hasattr(chat.choices[0], "message")
-                or not hasattr(chat.choices[0].message, "content")):
-            return None
-
-        return chat.choices[0].message.content
+        return complete(**create_resume_request(job=self.job, applicant=self.applicant))
 
     def create_file(self) -> Optional[str]:
 
@@ -65,23 +43,26 @@ class ResumeModel(FileModel):
             log_dir = tempfile.gettempdir()
         log_file_name = f"{self.applicant.first_name.capitalize()}_{self.applicant.last_name.capitalize()}_Resume_{self.job.source_id}"
 
+        # Fill resume with template
+        data = json.loads(self.text)
+        data.update({"job": self.job})
+
+        # Reuse the document with the same template and data
+        artifact_store = get_artifact_store()
+        if artifact_store:
+            return artifact_store.create_file(
+                template_file_path, data, log_file_name, owner=create_owner("resume", self.job, self.applicant)
+            )
+
         result_files = (
             os.path.join(log_dir, f"{log_file_name}{template_file_ext}"),
             os.path.join(log_dir, f"{log_file_name}.pdf")
         )
-
-        # Fill resume with template
-        text = self.text.replace("```json", "").replace("```", "")
-        data = json.loads(text)
-        data.update({"job": self.job})
-
-        doc = DocxTemplate(template_file_path)
-        doc.render(data)
-        doc.save(result_files[0])
+        render_file(template_file_path, data, result_files[0])
 
         # Save resume with PDF ext
         if libreoffice_available():
-            convert_to_pdf_with_libreoffice(result_files[0], result_files[1])
+            convert_to_pdf(result_files[0], result_files[1])
             resume_result_file = result_files[1]
         else:
             resume_result_file = result_files[0]
@@ -89,6 +70,18 @@ class ResumeModel(FileModel):
         return resume_result_file
 
 
+def create_resume_request(job: "Job", applicant: "Applicant") -> Dict[str, Any]:
+    return {
+        "messages": create_messages(
+            "create_applicant_resume",
+            job=job,
+            applicant=applicant,
+            json=json.dumps({"applicant": SETTINGS["applicant"]})
+        ),
+        "response_format": {"type": "json_object"},
+    }
+
+
 def log_resume(resume: ResumeModel) -> None:
     data = {
         'job_applicant': f"{resume.applicant.first_name} {resume.applicant.last_name}",
@@ -0,0 +1,273 @@
+import json
+import os
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any
+
+from job_applier.log import logger
+from job_applier.models.application import Application, save_application_applied, log_application
+from job_applier.models.email import get_transport
+from job_applier.models.outbox import OutboxMessage, OutboxStatus, save_outbox_message, get_outbox_messages, \
+    count_outbox_messages
+from job_applier.settings import SETTINGS
+from job_applier.utils.rate_limit import TokenBucket, get_backoff
+from job_applier.utils.smtp_pool import SmtpPool, CONNECTION_ERRORS
+
+_SENDER: Optional["OutboxSender"] = None
+_SENDER_LOCK = threading.Lock()
+
+
+class OutboxSender:
+    """
+    Background sender of messages from the outbox.
+    Messages are sent in parallel within the rate and the daily quota of the provider,
+    messages failed by transient errors are retried with backoff, the rest stay in the outbox for the next run.
+    :param transport: The pool of SMTP connections
+    :param provider: Name of the provider, i.e. the SMTP host
+    :param per_minute: Maximum number of messages per minute (0 - unlimited)
+    :param per_day: Maximum number of messages per 24 hours, messages sent by previous runs are counted (0 - unlimited)
+    :param workers: Number of messages sent in parallel
+    :param retry_attempts: Number of retries of a message failed by a transient error
+    :param backoff: Base seconds of the exponential backoff between retries
+    :param max_backoff: Maximum seconds between retries
+    :param poll_interval: Seconds between checks of the outbox for due messages
+    """
+
+    def __init__(self, transport: SmtpPool, provider: str, per_minute: float = 0, per_day: int = 0,
+                 workers: int = 1, retry_attempts: int = 0, backoff: float = 60, max_backoff: float = 3600,
+                 poll_interval: float = 5) -> None:
+        self.transport = transport
+        self.provider = provider
+        self.bucket = TokenBucket(rate=per_minute / 60, capacity=per_minute)
+        self.per_day = per_day
+        self.workers = max(workers, 1)
+        self.retry_attempts = retry_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.applications: Dict[int, Application] = {}
+        self.stats = {"sent": 0, "retried": 0, "failed": 0}
+        self._sent_today = 0
+        self._halted = False
+        self._in_flight = set()
+        self._slots = threading.Semaphore(self.workers)
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._sent_today = count_outbox_messages(
+                [OutboxStatus.SENT], provider=self.provider, sent_since=datetime.now() - timedelta(days=1)
+            )
+            self._thread = threading.Thread(target=self.run, name="outbox-sender", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, application: Application) -> bool:
+        """
+        Puts the email of the saved application to the outbox.
+        :return: True if the message is in the outbox, False if the application already has a message there
+        """
+
+        if count_outbox_messages([OutboxStatus.PENDING, OutboxStatus.SENT], application_id=application.id):
+            return False
+
+        recipients, message = application.email.create_message()
+        outbox_message = save_outbox_message(OutboxMessage(
+            application_id=application.id,
+            provider=self.provider,
+            recipients=json.dumps(recipients),
+            message=message,
+            status=OutboxStatus.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.now()
+        ))
+        if not outbox_message:
+            return False
+
+        with self._lock:
+            self.applications[application.id] = application
+        self._wake.set()
+        return True
+
+    def stop(self) -> None:
+        """
+        Waits until all due messages are sent, messages scheduled for later retries stay in the outbox.
+        Applications whose messages were not sent are logged as not applied.
+        """
+
+        self._stopping.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        with self._lock:
+            applications, self.applications = list(self.applications.values()), {}
+        for application in applications:
+            self.log_application(application)
+
+    def run(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while not self._halted:
+                with self._lock:
+                    in_flight = set(self._in_flight)
+                messages = [
+                    message for message in get_outbox_messages(self.provider, datetime.now(), self.workers * 2)
+                    if message.id not in in_flight
+                ]
+
+                if not messages:
+                    if self._stopping.is_set() and not in_flight:
+                        break
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+                    continue
+
+                for message in messages:
+                    if not self.reserve():
+                        break
+                    self._slots.acquire()
+                    self.bucket.acquire()
+                    with self._lock:
+                        self._in_flight.add(message.id)
+                    executor.submit(self.deliver, message)
+
+        if self._halted:
+            logger.warning(f"Sending to {self.provider} is stopped, "
+                           f"unsent messages stay in the outbox for the next run.")
+
+    def reserve(self) -> bool:
+        with self._lock:
+            if self._halted:
+                return False
+            if self.per_day and self._sent_today >= self.per_day:
+                logger.warning(f"Daily quota of {self.provider} ({self.per_day} messages) is reached.")
+                self._halted = True
+                return False
+            self._sent_today += 1
+            return True
+
+    def deliver(self, message: OutboxMessage) -> None:
+        try:
+            self.transport.send(json.loads(message.recipients), message.message)
+        except Exception as e:
+            self.fail(message, e)
+        else:
+            message.status = OutboxStatus.SENT
+            message.sent_at = datetime.now()
+            message.error = None
+            save_outbox_message(message)
+            if message.application_id:
+                save_application_applied(message.application_id, message.sent_at)
+            with self._lock:
+                application = self.applications.pop(message.application_id, None)
+                self.stats["sent"] += 1
+            if application:
+                application.applied = True
+                application.applied_at = message.sent_at
+                self.log_application(application)
+        finally:
+            with self._lock:
+                self._in_flight.discard(message.id)
+            self._slots.release()
+            self._wake.set()
+
+    def fail(self, message: OutboxMessage, error: Exception) -> None:
+        # The reserved message of the quota was not sent
+        with self._lock:
+            self._sent_today -= 1
+
+        message.attempts += 1
+        message.error = str(error)
+        if is_halting_error(error):
+            logger.error(f"Sending to {self.provider} is stopped: {error}")
+            with self._lock:
+                self._halted = True
+        elif is_transient_error(error) and message.attempts <= self.retry_attempts:
+            delay = get_backoff(message.attempts, self.backoff, self.max_backoff)
+            message.next_attempt_at = datetime.now() + timedelta(seconds=delay)
+            logger.warning(f"Message {message.id} is not sent ({error}), retry {message.attempts}/"
+                           f"{self.retry_attempts} in {delay:.0f}s")
+            self._count("retried")
+        else:
+            message.status = OutboxStatus.FAILED
+            logger.error(f"Message {message.id} is not sent: {error}")
+            self._count("failed")
+        save_outbox_message(message)
+
+    def log_application(self, application: Application) -> None:
+        if not SETTINGS['log']['applications']['file']:
+            return
+        # Applications are logged by workers, so the file is written by one of them at a time
+        with self._log_lock:
+            log_application(application)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def log_stats(self) -> None:
+        pending = count_outbox_messages([OutboxStatus.PENDING], provider=self.provider)
+        logger.info(
+            f"Outbox {self.provider}: sent {self.stats['sent']}, retried {self.stats['retried']}, "
+            f"failed {self.stats['failed']}, pending {pending}, sent in 24 hours {self._sent_today}"
+        )
+
+
+def is_transient_error(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        # Codes 4xx are temporary by SMTP
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, CONNECTION_ERRORS + (smtplib.SMTPConnectError, OSError))
+
+
+def is_halting_error(error: Exception) -> bool:
+    # Messages can not be sent until the login is fixed or the quota is renewed, they are kept in the outbox
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return True
+    if not isinstance(error, smtplib.SMTPResponseException):
+        return False
+    text = error.smtp_error.decode(errors="ignore") if isinstance(error.smtp_error, bytes) else str(error.smtp_error)
+    return "5.4.5" in text or "quota" in text.lower() or "limit exceeded" in text.lower()
+
+
+def get_provider_limits(provider: str) -> Dict[str, Any]:
+    providers = SETTINGS['email']['outbox']['providers']
+    return providers.get(provider) or providers['default']
+
+
+def get_outbox_sender() -> Optional[OutboxSender]:
+    global _SENDER
+
+    settings = SETTINGS['email']['outbox']
+    if not settings['enabled']:
+        return None
+
+    with _SENDER_LOCK:
+        if _SENDER is None:
+            provider = os.getenv("EMAIL_HOST") or "default"
+            limits = get_provider_limits(provider)
+            _SENDER = OutboxSender(
+                transport=get_transport(),
+                provider=provider,
+                per_minute=limits['per_minute'],
+                per_day=limits['per_day'],
+                workers=SETTINGS['email']['connections'],
+                retry_attempts=settings['retry']['attempts'],
+                backoff=settings['retry']['backoff'],
+                max_backoff=settings['retry']['max_backoff'],
+                poll_interval=settings['poll_interval']
+            )
+        return _SENDER
+
+
+def log_stats() -> None:
+    if _SENDER:
+        _SENDER.log_stats()
@@ -0,0 +1,114 @@
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+
+from job_applier.databese import DATABASE_USE
+from job_applier.llm import complete, estimate_tokens
+from job_applier.log import logger
+from job_applier.models.job import save_condensed_description
+from job_applier.settings import SETTINGS
+
+if TYPE_CHECKING:
+    from job_applier import Applicant, Job
+
+_STATS: Dict[str, Dict[str, int]] = {}
+_STATS_LOCK = threading.Lock()
+
+
+class CondensedJob:
+    """
+    The job with the condensed description, other attributes are taken from the job.
+    """
+
+    def __init__(self, job: "Job", description: str) -> None:
+        self._job = job
+        self.description = description
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._job, name)
+
+
+def render_messages(name: str, **values) -> List[Dict[str, str]]:
+    prompt = SETTINGS["openai"][name]
+    return [
+        {"role": "developer", "content": prompt["developer_content"].format(**values)},
+        {"role": "user", "content": prompt["user_content"].format(**values)},
+    ]
+
+
+def create_messages(name: str, job: "Job", applicant: "Applicant", **values) -> List[Dict[str, str]]:
+    """
+    Renders the prompt from SETTINGS["openai"][name].
+    If the prompt is over the token budget, it is rendered again with the condensed job description.
+    :param name: Name of the prompt in settings
+    :param job: The job
+    :param applicant: The applicant
+    :param values: Other values of the prompt
+    :return: Messages of the prompt
+    """
+
+    messages = render_messages(name, job=job, applicant=applicant, **values)
+    tokens = estimate_tokens(messages)
+    condensed_tokens = None
+
+    max_tokens = SETTINGS["openai"]["prompt_budget"]["max_tokens"]
+    if max_tokens and tokens > max_tokens and job.description:
+        description = get_condensed_description(job)
+        if description:
+            messages = render_messages(name, job=CondensedJob(job, description), applicant=applicant, **values)
+            condensed_tokens = estimate_tokens(messages)
+            logger.info(f"Prompt {name} for job {job.source_id} is over the budget: {tokens} tokens, "
+                        f"{condensed_tokens} tokens with the condensed description")
+
+    count_tokens(name, tokens, condensed_tokens)
+    return messages
+
+
+def get_condensed_description(job: "Job") -> Optional[str]:
+    """
+    Returns the condensed description of the job, it is generated once for the description
+    and stored on the job, so all prompts and next runs use the same one.
+    """
+
+    max_words = SETTINGS["openai"]["prompt_budget"]["condensed_words"]
+    key = hashlib.sha256(f"{max_words}:{job.description}".encode()).hexdigest()
+    if job.condensed_description and job.condensed_description_key == key:
+        return job.condensed_description
+
+    try:
+        description = complete(render_messages("condense_job_description", job=job, max_words=max_words))
+    except Exception as e:
+        logging.error(f"Unexpected error while condensing description of job {job.source_id}: {e}")
+        return None
+    if not description:
+        return None
+
+    job.condensed_description = description
+    job.condensed_description_key = key
+    if DATABASE_USE:
+        save_condensed_description(job)
+    return description
+
+
+def count_tokens(name: str, tokens: int, condensed_tokens: Optional[int]) -> None:
+    with _STATS_LOCK:
+        stats = _STATS.setdefault(name, {"prompts": 0, "tokens": 0, "condensed": 0, "tokens_before": 0,
+                                         "tokens_after": 0})
+        stats["prompts"] += 1
+        if condensed_tokens is None:
+            stats["tokens"] += tokens
+        else:
+            stats["tokens"] += condensed_tokens
+            stats["condensed"] += 1
+            stats["tokens_before"] += tokens
+            stats["tokens_after"] += condensed_tokens
+
+
+def log_stats() -> None:
+    with _STATS_LOCK:
+        for name, stats in _STATS.items():
+            logger.info(
+                f"Prompt {name}: prompts {stats['prompts']}, tokens {stats['tokens']}, "
+                f"condensed {stats['condensed']} ({stats['tokens_before']} -> {stats['tokens_after']} tokens)"
+            )
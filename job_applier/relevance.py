@@ -0,0 +1,66 @@
+import time
+from typing import Iterable, Iterator, Dict, Tuple
+
+from job_applier.databese import DATABASE_USE
+from job_applier.log import logger
+from job_applier.models.applicant import Applicant
+from job_applier.models.job import Job, save_jobs_relevance
+from job_applier.settings import SETTINGS
+from job_applier.utils.tfidf import TfidfScorer
+
+# Minimum relevance of jobs scored by the run by their source and source ID,
+# it is relative to the best job of the run, so scores of other runs are not compared with it
+_MIN_RELEVANCE: Dict[Tuple[str, str], float] = {}
+
+
+def create_relevance_query() -> str:
+    applicant = SETTINGS['applicant']
+    parts = [applicant.get('summary') or ""]
+    parts.extend(applicant.get('skills') or [])
+    for experience in applicant.get('experience') or []:
+        parts.append(experience.get('title') or "")
+        parts.append(experience.get('description') or "")
+    return "\n".join(parts)
+
+
+def rank_jobs(jobs: Iterable[Job]) -> Iterator[Job]:
+    """
+    Scores relevance of jobs to the applicant skills, experience and summary,
+    stores scores on jobs and yields jobs from the most relevant one.
+    IDF depends on the jobs found by the run, so scores are compared only with the best score of the run.
+    All jobs of the run are collected before the first one is yielded, so applications are not created
+    while jobs are being found.
+    :param jobs: Jobs to rank, all of them are scored at once
+    :return: An iterator of ranked jobs
+    """
+
+    jobs = list(jobs)
+    if not jobs:
+        return
+
+    query = create_relevance_query()
+    if not query.strip():
+        logger.warning("Summary, skills and experience of the applicant are empty, jobs are not ranked by relevance.")
+        yield from jobs
+        return
+
+    started_at = time.perf_counter()
+    scorer = TfidfScorer(query)
+    scores = scorer.score([f"{job.title or ''}\n{job.description or ''}" for job in jobs])
+    for job, score in zip(jobs, scores):
+        job.relevance = round(float(score), 4)
+    min_relevance = max(job.relevance for job in jobs) * SETTINGS['job']['relevance']['min_share']
+    _MIN_RELEVANCE.update({(job.source, job.source_id): min_relevance for job in jobs})
+    logger.info(f"Relevance of {len(jobs)} jobs is scored in {time.perf_counter() - started_at:.3f}s, "
+                f"minimum relevance: {min_relevance:.4f}")
+
+    if DATABASE_USE:
+        save_jobs_relevance(jobs)
+
+    yield from sorted(jobs, key=lambda job: job.relevance, reverse=True)
+
+
+def is_relevant(job: Job, applicant: Applicant) -> bool:
+    # Jobs which were not scored by the run, e.g. resumed from previous batches, are not filtered
+    min_relevance = _MIN_RELEVANCE.get((job.source, job.source_id))
+    return min_relevance is None or job.relevance is None or job.relevance >= min_relevance
@@ -0,0 +1,125 @@
+import email.utils
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, Dict
+
+import requests
+
+# Limiters are shared by host between all clients of the process like token buckets
+_LIMITERS: Dict[str, "AdaptiveLimiter"] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class AdaptiveLimiter:
+    """
+    Thread-safe limiter of requests running in parallel (AIMD).
+    The limit grows additively while responses are healthy and is cut multiplicatively
+    on 429/5xx responses, failed requests and latency spikes.
+    :param max_concurrency: Maximum number of requests running in parallel
+    :param min_concurrency: Minimum number of requests running in parallel
+    :param increase: Value added to the limit after every round of healthy requests
+    :param decrease: Multiplier of the limit after an unhealthy response
+    :param latency_factor: A response slower than the average latency multiplied by this factor is a latency spike
+    """
+
+    # Number of responses used to learn the average latency before latency spikes are detected
+    WARMUP_RESPONSES = 5
+    # Weight of the last response in the average latency
+    LATENCY_WEIGHT = 0.2
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1, increase: float = 1,
+                 decrease: float = 0.5, latency_factor: float = 3) -> None:
+        self.max_concurrency = max(max_concurrency, 1)
+        self.min_concurrency = min(max(min_concurrency, 1), self.max_concurrency)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.limit = float(self.min_concurrency)
+        self.average_latency: Optional[float] = None
+        self._responses = 0
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._decreased_at = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    self._condition.wait(self._paused_until - now)
+                elif self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return
+                else:
+                    self._condition.wait()
+
+    def release(self, latency: float, status_code: Optional[int], retry_after: Optional[float] = None) -> None:
+        """
+        Releases the request slot and adapts the limit to the result of the request.
+        :param latency: Seconds spent on the request
+        :param status_code: Status code of the response, None if the request failed
+        :param retry_after: Seconds requested by the server to wait before next requests
+        """
+
+        with self._condition:
+            now = time.monotonic()
+            self._in_flight -= 1
+
+            latency_spike = (self._responses >= self.WARMUP_RESPONSES
+                             and latency > self.average_latency * self.latency_factor)
+            unhealthy = status_code is None or status_code in RETRYABLE_STATUS_CODES or latency_spike
+
+            if unhealthy:
+                # Responses of requests sent before the last decrease do not decrease the limit again
+                if now - self._decreased_at > (self.average_latency or latency):
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                    self._decreased_at = now
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + self.increase / self.limit)
+
+            if status_code is not None and status_code not in RETRYABLE_STATUS_CODES:
+                self._responses += 1
+                if self.average_latency is None:
+                    self.average_latency = latency
+                elif not latency_spike:
+                    self.average_latency += (latency - self.average_latency) * self.LATENCY_WEIGHT
+
+            self._condition.notify_all()
+
+
+def get_limiter(host: str, **kwargs) -> AdaptiveLimiter:
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(host)
+        if limiter is None:
+            limiter = AdaptiveLimiter(**kwargs)
+            _LIMITERS[host] = limiter
+        return limiter
+
+
+def get_retry_after(response: Optional[requests.Response]) -> Optional[float]:
+    """
+    Returns seconds from the Retry-After header, the header can contain seconds or HTTP date.
+    """
+
+    if response is None or not response.headers.get("Retry-After"):
+        return None
+
+    value = response.headers["Retry-After"].strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+def is_retryable(response: Optional[requests.Response]) -> bool:
+    return response is None or response.status_code in RETRYABLE_STATUS_CODES
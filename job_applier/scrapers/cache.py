@@ -0,0 +1,219 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Callable
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from job_applier.log import logger
+from job_applier.settings import SETTINGS
+
+_CACHE: Optional["HttpCache"] = None
+_CACHE_LOCK = threading.Lock()
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    stored_at: float
+
+    @classmethod
+    def from_response(cls, response: requests.Response) -> "CachedResponse":
+        return cls(
+            url=response.url,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+            content=response.content,
+            stored_at=time.time()
+        )
+
+    def to_response(self) -> requests.Response:
+        response = requests.Response()
+        response.url = self.url
+        response.status_code = self.status_code
+        response.headers.update(self.headers)
+        response._content = self.content
+        return response
+
+
+class CacheStore(ABC):
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, entry: CachedResponse) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteCacheStore(CacheStore):
+
+    def __init__(self, file_path: str) -> None:
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, url TEXT, status_code INTEGER, headers TEXT, content BLOB, stored_at REAL)"
+        )
+        self._connection.commit()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT url, status_code, headers, content, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        return CachedResponse(
+            url=row[0],
+            status_code=row[1],
+            headers=json.loads(row[2]),
+            content=row[3],
+            stored_at=row[4]
+        )
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status_code, headers, content, stored_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, entry.url, entry.status_code, json.dumps(entry.headers), entry.content, entry.stored_at)
+            )
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class HttpCache:
+    """
+    Cache of scraper responses.
+    Only URLs matching a configured prefix are cached, each prefix has its own TTL.
+    Expired GET responses are revalidated with ETag/Last-Modified when the server provided them.
+    :param store: The storage of cached responses
+    :param ttl: TTL in seconds by URL prefix, 0 - responses are stored only to be replayed offline
+    :param offline: If true, cached responses are returned regardless of their age and nothing is requested
+    """
+
+    def __init__(self, store: CacheStore, ttl: Dict[str, float], offline: bool = False) -> None:
+        self.store = store
+        self.ttl = ttl or {}
+        self.offline = offline
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0}
+        self._stats_lock = threading.Lock()
+
+    def get_ttl(self, url: str) -> Optional[float]:
+        matches = [prefix for prefix in self.ttl if url.startswith(prefix)]
+        if not matches:
+            return None
+        return self.ttl[max(matches, key=len)]
+
+    @staticmethod
+    def create_key(method: str, url: str, params: Any = None, data: Any = None,
+                   cache_key: Optional[str] = None) -> str:
+        prepared = requests.Request(method, url, params=params, data=data).prepare()
+        body = prepared.body if isinstance(prepared.body, bytes) else str(prepared.body or "").encode()
+        if cache_key is not None:
+            body += f" {cache_key}".encode()
+        return hashlib.sha256(f"{method} {prepared.url} ".encode() + body).hexdigest()
+
+    def request(self, method: str, url: str, send: Callable[..., requests.Response],
+                cache_key: Optional[str] = None, **kwargs: Any) -> requests.Response:
+        """
+        Returns the cached response or sends the request with the provided function and caches its response.
+        :param method: HTTP method
+        :param url: Requested URL
+        :param send: The function sending the request, it accepts method, url and request kwargs
+        :param cache_key: Identifies responses which depend on the session state rather than on the request,
+            e.g. pages of search results
+        :return: The response
+        """
+
+        ttl = self.get_ttl(url)
+        if ttl is None and not self.offline:
+            return send(method, url, **kwargs)
+
+        key = self.create_key(method, url, kwargs.get("params"), kwargs.get("data"), cache_key)
+        entry = self.store.get(key)
+
+        if entry and (self.offline or time.time() - entry.stored_at < ttl):
+            self._count("hits")
+            return entry.to_response()
+
+        if self.offline:
+            self._count("misses")
+            response = requests.Response()
+            response.url = url
+            response.status_code = 504
+            response._content = b""
+            return response
+
+        # Revalidate expired response
+        if entry and method == "GET" and ttl > 0:
+            entry_headers = CaseInsensitiveDict(entry.headers)
+            headers = dict(kwargs.pop("headers", None) or {})
+            if "ETag" in entry_headers:
+                headers["If-None-Match"] = entry_headers["ETag"]
+            if "Last-Modified" in entry_headers:
+                headers["If-Modified-Since"] = entry_headers["Last-Modified"]
+            kwargs["headers"] = headers
+
+        response = send(method, url, **kwargs)
+
+        if entry and response.status_code == 304:
+            self._count("revalidated")
+            entry.stored_at = time.time()
+            self.store.set(key, entry)
+            return entry.to_response()
+
+        self._count("misses")
+        if response.status_code == 200:
+            self.store.set(key, CachedResponse.from_response(response))
+            self._count("stored")
+
+        return response
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def log_stats(self) -> None:
+        logger.info(
+            f"HTTP cache: hits {self.stats['hits']}, revalidated {self.stats['revalidated']}, "
+            f"misses {self.stats['misses']}, stored {self.stats['stored']}"
+        )
+
+
+def get_cache() -> Optional[HttpCache]:
+    global _CACHE
+
+    settings = SETTINGS['scrapers']['cache']
+    if not settings['file']:
+        return None
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = HttpCache(
+                store=SqliteCacheStore(settings['file']),
+                ttl=settings['ttl'],
+                offline=settings['offline']
+            )
+        return _CACHE
+
+
+def log_stats() -> None:
+    if _CACHE:
+        _CACHE.log_stats()
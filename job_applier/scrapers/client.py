@@ -0,0 +1,137 @@
+import threading
+import time
+import urllib.parse
+from typing import Dict, Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from job_applier.log import logger
+from job_applier.scrapers.adaptive import get_limiter, get_retry_after, is_retryable
+from job_applier.scrapers.cache import HttpCache, get_cache
+from job_applier.utils.rate_limit import TokenBucket, get_backoff
+
+# Token buckets are shared by host between all clients of the process,
+# so several scrapers/queries hitting the same site share one budget.
+_BUCKETS: Dict[str, TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def get_bucket(host: str, rate: float, burst: float) -> TokenBucket:
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate=rate, capacity=burst)
+            _BUCKETS[host] = bucket
+        return bucket
+
+
+def create_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class ScraperClient:
+    """
+    HTTP client shared by all requests of a scraper run.
+    Keeps one pooled session and throttles requests with a token bucket per host.
+    The number of requests running in parallel for one host is adapted to the site health,
+    failed requests and 429/5xx responses are retried with backoff.
+    :param concurrency: Maximum number of requests allowed to run in parallel
+    :param rate: Requests per second allowed for one host
+    :param burst: Number of requests allowed to be sent at once for one host
+    :param cache: The cache of responses, cached responses are not throttled
+    :param timeout: Seconds to wait for a response
+    :param adaptive: Settings of the adaptive concurrency limiter (see AdaptiveLimiter)
+    :param retry_attempts: Number of retries of a failed request
+    :param backoff: Base seconds of the exponential backoff between retries
+    :param max_backoff: Maximum seconds between retries
+    """
+
+    def __init__(self, concurrency: int = 1, rate: float = 0, burst: float = 1,
+                 cache: Optional[HttpCache] = None, timeout: Optional[float] = None,
+                 adaptive: Optional[Dict[str, float]] = None, retry_attempts: int = 0,
+                 backoff: float = 1, max_backoff: float = 60) -> None:
+        self.concurrency = max(int(concurrency), 1)
+        self.rate = rate
+        self.burst = burst
+        self.cache = cache
+        self.timeout = timeout
+        self.adaptive = adaptive or {}
+        self.retry_attempts = retry_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = create_session(pool_size=self.concurrency)
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "ScraperClient":
+        return cls(
+            concurrency=settings['concurrency'],
+            rate=settings['rate_limit']['rate'],
+            burst=settings['rate_limit']['burst'],
+            cache=get_cache(),
+            timeout=settings['timeout'],
+            adaptive=settings['adaptive'],
+            retry_attempts=settings['retry']['attempts'],
+            backoff=settings['retry']['backoff'],
+            max_backoff=settings['retry']['max_backoff'],
+        )
+
+    def request(self, method: str, url: str, cache_key: Optional[str] = None, **kwargs: Any) -> requests.Response:
+        if self.cache:
+            return self.cache.request(method, url, self.send, cache_key=cache_key, **kwargs)
+        return self.send(method, url, **kwargs)
+
+    def send(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        host = urllib.parse.urlparse(url).netloc
+        bucket = get_bucket(host, self.rate, self.burst)
+        limiter = get_limiter(host, max_concurrency=self.concurrency, **self.adaptive)
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+        while True:
+            bucket.acquire()
+            limiter.acquire()
+
+            response, error = None, None
+            started_at = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            retry_after = get_retry_after(response)
+            limiter.release(time.monotonic() - started_at, response.status_code if response is not None else None,
+                            retry_after)
+
+            if not is_retryable(response) or attempt >= self.retry_attempts:
+                break
+
+            delay = retry_after if retry_after is not None else get_backoff(attempt, self.backoff, self.max_backoff)
+            attempt += 1
+            logger.warning(
+                f"Request {method} {url} failed ({error or response.status_code}), "
+                f"retry {attempt}/{self.retry_attempts} in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+        if error:
+            raise error
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "ScraperClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
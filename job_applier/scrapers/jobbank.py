@@ -1,14 +1,21 @@
-import random
 import re
+import threading
 import urllib.parse
-from datetime import datetime
-from time import sleep
-from typing import NamedTuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import NamedTuple, Optional, Iterator, List, Union, Set, Callable
 
+import lxml.etree
+import lxml.html
 import requests
-from bs4 import BeautifulSoup
+from lxml.html import HtmlElement
 
-from job_applier.models.job import Job, SalaryType, Workspace
+from job_applier.log import logger
+from job_applier.models.job import Job, SalaryType, Workspace, get_jobs
+from job_applier.scrapers.client import ScraperClient
+from job_applier.settings import SETTINGS
+from job_applier.utils.concurrency import iterate_concurrently
 
 
 class ApiPaths(NamedTuple):
@@ -25,32 +32,107 @@ API_PATHS = ApiPaths(
     CITYSEARCH="/core/ta-cityprovsuggest_en/select"
 )
 
+RESULT_BLOCK_ID = "ajaxupdateform:result_block"
 
-def find_jobs(job_title: str, location: str, sort: str = "M") -> list[Job]:
+# Pages are parsed with lxml directly, the text is collected the same way as BeautifulSoup does
+NON_TEXT_TAGS = {"script", "style"}
+
+
+def find_jobs(job_title: Union[str, List[str]], location: Union[str, List[str]],
+              sort: Optional[str] = None) -> Iterator[Job]:
     """
-    This function will scrape the job bank website for jobs based on the job title and location provided.
-    :param job_title: The job title to search for
-    :param location: The location to search for
+    This function will scrape the job bank website for jobs based on the job titles and locations provided.
+    Every title is searched in every location, queries are run concurrently.
+    Jobs are yielded page by page as soon as their details are fetched, a job found by several queries
+    is fetched and yielded only once.
+    :param job_title: The job title or list of job titles to search for
+    :param location: The location or list of locations to search for
     :param sort: The sorting option for the search results (M = Most relevant, D = Most recent)
-    :return: A list of Job objects
+    :return: An iterator of Job objects
     """
 
-    result = []
+    job_titles = [job_title] if isinstance(job_title, str) else job_title
+    locations = [location] if isinstance(location, str) else location
+    sort = sort or SETTINGS['scrapers']['jobbank']['sort']
 
-    with requests.Session() as session:
+    with ScraperClient.from_settings(SETTINGS['scrapers']['jobbank']) as client, \
+            ThreadPoolExecutor(max_workers=client.concurrency) as details_executor:
+
+        # Get location IDs once for all queries
+        location_ids = {}
+        for current_location in locations:
+            location_id = find_location_id(client, current_location)
+            if location_id is not None:
+                location_ids[current_location] = location_id
+
+        # Source IDs of jobs already yielded by any query
+        claimed_source_ids: Set[str] = set()
+        claimed_source_ids_lock = threading.Lock()
+
+        def claim(jobs: List[Job]) -> List[Job]:
+            with claimed_source_ids_lock:
+                new_jobs = [job for job in jobs if job.source_id not in claimed_source_ids]
+                claimed_source_ids.update(job.source_id for job in new_jobs)
+            return new_jobs
+
+        queries = [
+            partial(find_query_jobs, current_title, current_location, location_id, sort, client, details_executor, claim)
+            for current_title in job_titles
+            for current_location, location_id in location_ids.items()
+        ]
+
+        yield from iterate_concurrently(queries)
 
-        # Get location ID
-        response = session.get(
-            urllib.parse.urljoin(API_PATHS.DOMAIN, API_PATHS.CITYSEARCH),
-            params={"q": location, "wt": "json"},
-        )
-        if response.status_code != 200:
-            return result
 
-        location_id = response.json()["response"]["docs"][0]["city_id"]
+def find_location_id(client: ScraperClient, location: str) -> Optional[str]:
+    """
+    This function will find the job bank ID of the location.
+    :param client: The scraper client
+    :param location: The location to search for
+    :return: The location ID, None if the location is not found
+    """
+
+    response = client.get(
+        urllib.parse.urljoin(API_PATHS.DOMAIN, API_PATHS.CITYSEARCH),
+        params={"q": location, "wt": "json"},
+    )
+    if response.status_code != 200:
+        logger.warning(f"Job bank location search failed, location: {location}, status: {response.status_code}")
+        return None
+
+    docs = response.json()["response"]["docs"]
+    if not docs:
+        return None
+
+    return docs[0]["city_id"]
+
+
+def find_query_jobs(
+        job_title: str,
+        location: str,
+        location_id: str,
+        sort: str,
+        details_client: ScraperClient,
+        details_executor: ThreadPoolExecutor,
+        claim: Callable[[List[Job]], List[Job]]
+) -> Iterator[Job]:
+    """
+    This function will scrape the jobs of one search query.
+    Search results are paginated by the server session, so every query uses its own client for pagination.
+    :param job_title: The job title to search for
+    :param location: The location to search for
+    :param location_id: The job bank ID of the location
+    :param sort: The sorting option for the search results (M = Most relevant, D = Most recent)
+    :param details_client: The client shared by queries for fetching job details
+    :param details_executor: The executor shared by queries for fetching job details
+    :param claim: The function returning jobs which are not yielded by other queries yet
+    :return: An iterator of Job objects
+    """
+
+    with ScraperClient.from_settings(SETTINGS['scrapers']['jobbank']) as client:
 
         # Load main result
-        response = session.get(
+        response = client.get(
             urllib.parse.urljoin(API_PATHS.DOMAIN, API_PATHS.JOBSEARCH),
             params={
                 "searchstring": job_title,
@@ -60,147 +142,329 @@ def find_jobs(job_title: str, location: str, sort: str = "M") -> list[Job]:
             },
         )
         if response.status_code != 200:
-            return result
+            logger.warning(f"Job bank search failed, title: {job_title}, location: {location}, "
+                           f"status: {response.status_code}")
+            return
 
-        soup = BeautifulSoup(response.content, "html.parser")
-        result_element = soup.find(id="ajaxupdateform:result_block")
-        if not result_element:
-            return result
+        page_jobs = parse_jobs(response.content, RESULT_BLOCK_ID, get_encoding(response))
+        if page_jobs is None:
+            return
 
-        articles = result_element.find_all("article")
+        incremental = SETTINGS['scrapers']['jobbank']['incremental']
+        stop_on_known = incremental['enabled'] and sort == "D"
+        refresh_after = datetime.now() - timedelta(hours=incremental['refresh_age'])
+        known_run = 0
+        page = 0
 
         # Load more results
-        while True:
-            response = session.get(f"{API_PATHS.DOMAIN}{API_PATHS.JOBSEARCH_MORE}")
-            soup = BeautifulSoup(response.content, "html.parser")
-            extra_articles = soup.find_all("article")
-            if not extra_articles:
+        while page_jobs:
+
+            known_jobs = get_jobs("jobbank", [job.source_id for job in page_jobs]) \
+                if incremental['enabled'] else {}
+
+            # Reuse details of known jobs which are not expired yet,
+            # fill details of others, requests are throttled by the client rate limiter
+            yield from details_executor.map(
+                lambda job: job if fill_known_job_details(job, known_jobs.get(job.source_id), refresh_after)
+                else fill_job_details(job, details_client),
+                claim(page_jobs)
+            )
+
+            # Stop paginating when the most recent jobs are already known
+            for job in page_jobs:
+                known_run = known_run + 1 if job.source_id in known_jobs else 0
+            if stop_on_known and known_run >= incremental['stop_after_known']:
                 break
-            for article in extra_articles:
-                articles.append(article)
-            sleep(random.uniform(0, 1))
 
-        for job_element in articles:
-            sleep(random.uniform(0, 1))
+            # Next pages depend on the session, so they are cached by the query and the page number
+            page += 1
+            response = client.get(
+                f"{API_PATHS.DOMAIN}{API_PATHS.JOBSEARCH_MORE}",
+                cache_key=f"{job_title}|{location}|{location_id}|{sort}|{page}"
+            )
+            if response.status_code != 200:
+                logger.warning(f"Job bank search stopped, title: {job_title}, location: {location}, "
+                               f"status: {response.status_code}")
+                break
+            page_jobs = parse_jobs(response.content, encoding=get_encoding(response)) or []
 
-            job = Job()
 
-            link_element = job_element.find("a", class_="resultJobItem")
-            if link_element:
-                href = link_element.get("href")
-                url_parts = urllib.parse.urlparse(href)
-                job.link = urllib.parse.urljoin(API_PATHS.DOMAIN, url_parts.path)
+def parse_jobs(content: bytes, container_id: Optional[str] = None,
+               encoding: Optional[str] = None) -> Optional[List[Job]]:
+    """
+    This function will parse the jobs from the search result page.
+    :param content: The content of the search result page
+    :param container_id: The ID of the element containing articles, if not provided articles are taken from the whole page
+    :param encoding: The encoding of the content, if not provided it is taken from the page
+    :return: A list of Job objects without details, None if the page does not contain results
+    """
 
-            job.source_id = job_element.get("id").replace("article-", "")
-            job.source = "jobbank"
+    root = parse_html(content, encoding)
+    if root is None:
+        return None
 
-            job.posted_on_jb = job_element.find("span", class_="postedonJB") is not None
+    if container_id:
+        root = root.get_element_by_id(container_id, None)
+        if root is None:
+            return None
 
-            title_element = job_element.find("span", class_="noctitle")
-            if title_element:
-                job.title = str(title_element.get_text(strip=True)).capitalize()
+    return [parse_job(job_element) for job_element in root.iter("article")]
 
-            date_element = job_element.find("li", class_="date")
-            if date_element:
-                date_text = date_element.get_text(strip=True)
-                try:
-                    job.date = datetime.strptime(date_text, "%B %d, %Y")
-                except:
-                    pass
 
-            business_element = job_element.find("li", class_="business")
-            if business_element:
-                job.business = business_element.get_text(strip=True)
+def parse_job_description(content: bytes, encoding: Optional[str] = None) -> Optional[str]:
+    """
+    This function will parse the job description from the job posting page.
+    :param content: The content of the job posting page
+    :param encoding: The encoding of the content, if not provided it is taken from the page
+    :return: The job description
+    """
 
-            location_element = job_element.find("li", class_="location")
-            if location_element:
-                for child in location_element.find_all("span"):
-                    child.extract()
-                job.location = location_element.get_text(strip=True)
+    root = parse_html(content, encoding)
+    if root is None:
+        return None
 
-            salary_element = job_element.find("li", class_="salary")
-            if salary_element:
-                for child in salary_element.find_all("span"):
-                    child.extract()
-                salary_text = salary_element.get_text(strip=True)
-                salary_text = salary_text.lower()
+    job_posting_element = next((e for e in root.iter("div") if e.get("typeof") == "JobPosting"), None)
+    if job_posting_element is None:
+        return None
 
-                if "hourly" in salary_text:
-                    job.salary_type = SalaryType.HOURLY
-                elif "annually" in salary_text:
-                    job.salary_type = SalaryType.ANNUALLY
+    job_description_element = next(
+        (e for e in find_all(job_posting_element, "span", "hidden") if e.get("property") == "description"), None
+    )
+    if job_description_element is None:
+        return None
 
-                match = re.search(r"\d+\.\d+", salary_text)
-                if match:
-                    job.salary = float(match.group())
+    job_description = get_text(job_description_element)
+    job_description = job_description.replace("\t", "")
+    job_description = job_description.replace("\n", "")
+    job_description = re.sub(r"\s{2,}", " ", job_description)
+    return job_description
 
-            workspace_element = job_element.find("span", class_="telework")
-            if workspace_element:
-                workspace_text = workspace_element.get_text(strip=True)
-                if "on site" in workspace_text:
-                    job.workspace = Workspace.ONSITE
-                elif "hybrid" in workspace_text:
-                    job.workspace = Workspace.HYBRID
 
-            fill_job_details(job)
+def parse_job_email(content: bytes) -> Optional[str]:
+    """
+    This function will parse the job email from the partial response of "Apply now" button.
+    :param content: The content of the partial response
+    :return: The job email
+    """
 
-            result.append(job)
+    try:
+        root = lxml.etree.fromstring(content, lxml.etree.XMLParser(recover=True))
+    except (lxml.etree.LxmlError, ValueError):
+        return None
+    if root is None:
+        return None
 
-    return result
+    cdata_element = next((e for e in root.iter("update") if e.get("id") == "applynow"), None)
+    if cdata_element is None:
+        return None
 
+    root = parse_html("".join(cdata_element.itertext()))
+    if root is None:
+        return None
 
-def fill_job_details(job: Job) -> Job:
+    email_element = next((e for e in root.iter("a") if "mailto:" in (e.get("href") or "")), None)
+    if email_element is None:
+        return None
+
+    return get_text(email_element, strip=False)
+
+
+def parse_job(job_element: HtmlElement) -> Job:
+    """
+    This function will parse the job from the search result article element.
+    :param job_element: The <article> element of the search result
+    :return: The Job object without details (description, email)
+    """
+
+    job = Job()
+
+    link_element = find(job_element, "a", "resultJobItem")
+    if link_element is not None:
+        href = link_element.get("href")
+        url_parts = urllib.parse.urlparse(href)
+        job.link = urllib.parse.urljoin(API_PATHS.DOMAIN, url_parts.path)
+
+    job.source_id = job_element.get("id").replace("article-", "")
+    job.source = "jobbank"
+
+    job.posted_on_jb = find(job_element, "span", "postedonJB") is not None
+
+    title_element = find(job_element, "span", "noctitle")
+    if title_element is not None:
+        job.title = str(get_text(title_element)).capitalize()
+
+    date_element = find(job_element, "li", "date")
+    if date_element is not None:
+        date_text = get_text(date_element)
+        try:
+            job.date = datetime.strptime(date_text, "%B %d, %Y")
+        except:
+            pass
+
+    business_element = find(job_element, "li", "business")
+    if business_element is not None:
+        job.business = get_text(business_element)
+
+    location_element = find(job_element, "li", "location")
+    if location_element is not None:
+        job.location = get_text(location_element, exclude="span")
+
+    salary_element = find(job_element, "li", "salary")
+    if salary_element is not None:
+        salary_text = get_text(salary_element, exclude="span")
+        salary_text = salary_text.lower()
+
+        if "hourly" in salary_text:
+            job.salary_type = SalaryType.HOURLY
+        elif "annually" in salary_text:
+            job.salary_type = SalaryType.ANNUALLY
+
+        match = re.search(r"\d+\.\d+", salary_text)
+        if match:
+            job.salary = float(match.group())
+
+    workspace_element = find(job_element, "span", "telework")
+    if workspace_element is not None:
+        workspace_text = get_text(workspace_element)
+        if "on site" in workspace_text:
+            job.workspace = Workspace.ONSITE
+        elif "hybrid" in workspace_text:
+            job.workspace = Workspace.HYBRID
+
+    return job
+
+
+def get_encoding(response: requests.Response) -> Optional[str]:
+    """
+    This function will find the encoding of the page the same way as BeautifulSoup does for pages without charset.
+    Without a charset in the headers requests falls back to ISO-8859-1 and lxml falls back to Latin-1
+    if the page has no meta charset, so the encoding is detected by the content then.
+    :param response: The response with the page
+    :return: The encoding of the page
+    """
+
+    if "charset" in response.headers.get("content-type", "").lower():
+        return requests.utils.get_encoding_from_headers(response.headers)
+    return response.apparent_encoding
+
+
+def parse_html(content: Union[bytes, str], encoding: Optional[str] = None) -> Optional[HtmlElement]:
+    if not content or not content.strip():
+        return None
+    if isinstance(content, bytes) and encoding:
+        try:
+            content = content.decode(encoding, errors="replace")
+        except LookupError:
+            pass
+    try:
+        return lxml.html.fromstring(content)
+    except (lxml.etree.LxmlError, ValueError):
+        return None
+
+
+def find_all(element: HtmlElement, tag: str, class_name: str) -> Iterator[HtmlElement]:
+    for child in element.iter(tag):
+        if class_name in (child.get("class") or "").split():
+            yield child
+
+
+def find(element: HtmlElement, tag: str, class_name: str) -> Optional[HtmlElement]:
+    return next(find_all(element, tag, class_name), None)
+
+
+def get_text(element: HtmlElement, strip: bool = True, exclude: Optional[str] = None) -> str:
+    """
+    This function will collect the text of the element the same way as BeautifulSoup get_text does,
+    comments, scripts and styles are skipped.
+    :param element: The element to collect the text from
+    :param strip: If true, every text part is stripped and empty parts are skipped
+    :param exclude: The tag which text is skipped (tail text after the tag is kept)
+    :return: The text of the element
+    """
+
+    parts = []
+
+    def collect(current: HtmlElement) -> None:
+        if current.text and current.tag not in NON_TEXT_TAGS:
+            parts.append(current.text)
+        for child in current:
+            if isinstance(child.tag, str) and child.tag != exclude:
+                collect(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    collect(element)
+
+    if strip:
+        return "".join(part.strip() for part in parts if part.strip())
+    return "".join(parts)
+
+
+def fill_known_job_details(job: Job, known_job: Optional[Job], refresh_after: datetime) -> bool:
+    """
+    This function will copy the job details from the already saved job if they are fresh enough.
+    :param job: The job object to fill the details
+    :param known_job: The same job saved in the database
+    :param refresh_after: The details fetched before this time have to be fetched again
+    :return: True if the details were copied, otherwise False
+    """
+
+    if not known_job or not known_job.details_updated_at or known_job.details_updated_at < refresh_after:
+        return False
+
+    job.description = known_job.description
+    job.email = known_job.email
+    job.details_updated_at = known_job.details_updated_at
+    return True
+
+
+def fill_job_details(job: Job, client: Optional[ScraperClient] = None) -> Job:
     """
     This function will scrape the job details from the provided job object.
     :param job: The job object to scrape the details from
+    :param client: The shared scraper client, if not provided a new one is created for this job
     :return: A string containing the job details
     """
 
     if not job.link:
         return job
 
-    with requests.Session() as session:
-
-        link = job.link
-
-        # Get page with job description
-        response = session.get(link)
-        soup = BeautifulSoup(response.content, "html.parser")
-        job_posting_element = soup.find("div", attrs={"typeof": "JobPosting"})
-        if job_posting_element:
-            job_description_element = job_posting_element.find(
-                "span", class_="hidden", attrs={"property": "description"}
-            )
-            if job_description_element:
-                job_description = job_description_element.get_text(strip=True)
-                job_description = job_description.replace("\t", "")
-                job_description = job_description.replace("\n", "")
-                job_description = re.sub(r"\s{2,}", " ", job_description)
-                job.description = job_description
-
-        # Get information "How to apply"
-        responce = session.post(
-            link,
-            data={
-                "seekeractivity:jobid": job.source_id,
-                "seekeractivity_SUBMIT": "1",
-                "jakarta.faces.ViewState": "stateless",
-                "jakarta.faces.behavior.event": "action",
-                "action": "applynowbutton",
-                "jakarta.faces.partial.event": "click",
-                "jakarta.faces.source": "seekeractivity",
-                "jakarta.faces.partial.ajax": "true",
-                "jakarta.faces.partial.execute": "jobid",
-                "jakarta.faces.partial.render": "applynow markappliedgroup",
-                "seekeractivity": "seekeractivity",
-            },
-        )
-        soup = BeautifulSoup(responce.content, "xml")
-        cdata_element = soup.find("update", id="applynow")
-        if cdata_element:
-            soup = BeautifulSoup(cdata_element.get_text(), "html.parser")
-            email_element = soup.find("a", href=re.compile(r"mailto:"))
-            if email_element:
-                job.email = email_element.text
-
-        return job
+    if client is None:
+        with ScraperClient.from_settings(SETTINGS['scrapers']['jobbank']) as client:
+            return fill_job_details(job, client)
+
+    link = job.link
+
+    # Get page with job description
+    response = client.get(link)
+    job_description = parse_job_description(response.content, get_encoding(response)) \
+        if response.status_code == 200 else None
+    if job_description is not None:
+        job.description = job_description
+
+    # Get information "How to apply"
+    response = client.post(
+        link,
+        data={
+            "seekeractivity:jobid": job.source_id,
+            "seekeractivity_SUBMIT": "1",
+            "jakarta.faces.ViewState": "stateless",
+            "jakarta.faces.behavior.event": "action",
+            "action": "applynowbutton",
+            "jakarta.faces.partial.event": "click",
+            "jakarta.faces.source": "seekeractivity",
+            "jakarta.faces.partial.ajax": "true",
+            "jakarta.faces.partial.execute": "jobid",
+            "jakarta.faces.partial.render": "applynow markappliedgroup",
+            "seekeractivity": "seekeractivity",
+        },
+    )
+    job_email = parse_job_email(response.content) if response.status_code == 200 else None
+    if job_email is not None:
+        job.email = job_email
+
+    # Details which were not fetched are fetched again by the next run
+    if job_description is not None and job_email is not None:
+        job.details_updated_at = datetime.now()
+
+    return job
@@ -0,0 +1,90 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from queue import Queue, Full
+from typing import Callable, Iterable, Iterator, List, TypeVar, Deque
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_FINISHED = object()
+
+
+def iterate_concurrently(producers: List[Callable[[], Iterable[T]]], queue_size: int = 100) -> Iterator[T]:
+    """
+    Iterates every producer in its own thread and yields items as soon as any producer returns them.
+    Producers wait while the queue is full and stop when the result is not consumed anymore.
+    Errors of a producer are logged and do not stop other producers.
+    :param producers: Functions returning iterables
+    :param queue_size: Maximum number of produced items waiting to be consumed
+    :return: An iterator of items of all producers
+    """
+
+    if not producers:
+        return
+
+    items_queue: Queue = Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                items_queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def run(producer: Callable[[], Iterable[T]]) -> None:
+        items = None
+        try:
+            items = iter(producer())
+            for item in items:
+                if not put(item):
+                    return
+        except Exception as e:
+            logging.error(f"Unexpected error while iterating {getattr(producer, '__name__', producer)}: {e}")
+        finally:
+            if hasattr(items, "close"):
+                items.close()
+            put(_FINISHED)
+
+    finished_producers = 0
+    with ThreadPoolExecutor(max_workers=len(producers)) as executor:
+        for producer in producers:
+            executor.submit(run, producer)
+        try:
+            while finished_producers < len(producers):
+                item = items_queue.get()
+                if item is _FINISHED:
+                    finished_producers += 1
+                    continue
+                yield item
+        finally:
+            stopped.set()
+
+
+def map_concurrently(function: Callable[[T], R], items: Iterable[T], concurrency: int) -> Iterator[R]:
+    """
+    Applies the function to items in parallel threads and yields results in the order of items.
+    Unlike Executor.map, items are taken lazily, at most `concurrency` items are processed at once.
+    :param function: The function applied to every item
+    :param items: The items
+    :param concurrency: Number of items processed in parallel
+    :return: An iterator of results
+    """
+
+    concurrency = max(concurrency, 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures: Deque[Future] = deque()
+        try:
+            for item in items:
+                futures.append(executor.submit(function, item))
+                if len(futures) >= concurrency:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
@@ -1,6 +1,10 @@
+import logging
 import os
 import platform
-import subprocess
+
+from job_applier.settings import SETTINGS
+from job_applier.utils.libreoffice_pool import get_pool
+from job_applier.utils.pdf_batch import get_converter
 
 
 def find_libreoffice():
@@ -40,20 +44,55 @@ def libreoffice_available() -> bool:
 
 def convert_to_pdf_with_libreoffice(input_path, output_path):
     """
-    Converts a .docx file to .pdf using LibreOffice.
+    Converts a .docx file to .pdf using the pool of LibreOffice workers.
 
     :param input_path: Path to the input .docx file.
     :param output_path: Path to save the converted .pdf file.
+    :return: Seconds spent on the conversion.
     """
     # Find the path to LibreOffice
     libreoffice_path = find_libreoffice()
     if not libreoffice_path:
         raise FileNotFoundError("LibreOffice was not found. Please ensure it is installed.")
 
-    # Get the directory of the output file
-    output_dir = os.path.dirname(output_path)
+    # Workers are started with the first conversion and kept until the app exits
+    settings = SETTINGS['libreoffice']
+    pool = get_pool(libreoffice_path, settings['workers'], settings['profiles'], settings['start_timeout'])
+    return pool.convert(input_path, output_path)
+
+
+def convert_to_pdf(input_path, output_path):
+    """
+    Converts a .docx file to .pdf right away or enqueues it for the batch conversion,
+    enqueued files are converted by convert_pending_to_pdf.
+
+    :param input_path: Path to the input .docx file.
+    :param output_path: Path to save the converted .pdf file.
+    """
+    settings = SETTINGS['libreoffice']
+    if not settings['batch']['enabled']:
+        convert_to_pdf_with_libreoffice(input_path, output_path)
+        return
+
+    libreoffice_path = find_libreoffice()
+    if not libreoffice_path:
+        raise FileNotFoundError("LibreOffice was not found. Please ensure it is installed.")
+    shards = settings['batch']['shards'] or os.cpu_count() or 1
+    get_converter(libreoffice_path, shards, settings['profiles']).enqueue(input_path, output_path)
+
+
+def convert_pending_to_pdf():
+    """
+    Converts all files enqueued for the batch conversion, files failed in the batch are converted one by one.
+    """
+    libreoffice_path = find_libreoffice()
+    if not libreoffice_path or not SETTINGS['libreoffice']['batch']['enabled']:
+        return
 
-    # Run LibreOffice in headless mode to perform the conversion
-    subprocess.run([
-        libreoffice_path, "--headless", "--convert-to", "pdf", "--outdir", output_dir, input_path
-    ], check=True)
+    settings = SETTINGS['libreoffice']
+    shards = settings['batch']['shards'] or os.cpu_count() or 1
+    for input_path, output_path in get_converter(libreoffice_path, shards, settings['profiles']).flush():
+        try:
+            convert_to_pdf_with_libreoffice(input_path, output_path)
+        except Exception as e:
+            logging.error(f"Unexpected error while converting {input_path} to PDF: {e}")
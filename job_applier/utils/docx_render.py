@@ -0,0 +1,118 @@
+import atexit
+import copy
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, Iterable
+
+from docx import Document
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+
+from job_applier.settings import SETTINGS
+
+_DOCUMENTS: Dict[str, Any] = {}
+_DOCUMENTS_LOCK = threading.Lock()
+
+_PATCHED_XML: Dict[str, str] = {}
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+class TemplateEnvironment(Environment):
+    """
+    Jinja environment which compiles every source once, parts of a template are the same for every render.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.templates = {}
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals is not None or template_class is not None:
+            return super().from_string(source, globals, template_class)
+
+        template = self.templates.get(source)
+        if template is None:
+            template = self.templates[source] = super().from_string(source)
+        return template
+
+
+class CachedDocxTemplate(DocxTemplate):
+    """
+    The template which is rendered from the copy of the document parsed once per process,
+    the XML of its parts is prepared for Jinja once too.
+    """
+
+    def init_docx(self, reload: bool = True):
+        if not self.docx or (self.is_rendered and reload):
+            self.docx = copy.deepcopy(load_document(self.template_file))
+            self.is_rendered = False
+
+    def patch_xml(self, src_xml):
+        patched_xml = _PATCHED_XML.get(src_xml)
+        if patched_xml is None:
+            patched_xml = _PATCHED_XML[src_xml] = super().patch_xml(src_xml)
+        return patched_xml
+
+
+JINJA_ENV = TemplateEnvironment()
+
+
+def load_document(template_file_path: str):
+    with _DOCUMENTS_LOCK:
+        document = _DOCUMENTS.get(template_file_path)
+        if document is None:
+            document = _DOCUMENTS[template_file_path] = Document(template_file_path)
+        return document
+
+
+def load_templates(template_file_paths: Iterable[str]) -> None:
+    for template_file_path in template_file_paths:
+        load_document(template_file_path)
+
+
+def render_docx(template_file_path: str, context: Dict[str, Any], output_path: str) -> str:
+    """
+    Renders the template in the current process.
+    :param template_file_path: Path to the .docx template
+    :param context: Values of the template
+    :param output_path: Path to save the rendered document
+    :return: Path to the rendered document
+    """
+
+    doc = CachedDocxTemplate(template_file_path)
+    doc.render(context, JINJA_ENV)
+    doc.save(output_path)
+    return output_path
+
+
+def render_file(template_file_path: str, context: Dict[str, Any], output_path: str) -> str:
+    """
+    Renders the template by the pool of processes if it is configured, otherwise in the current process.
+    Documents of applications created concurrently are rendered in parallel on all configured processes.
+    """
+
+    pool = get_pool()
+    if pool is None:
+        return render_docx(template_file_path, context, output_path)
+    return pool.submit(render_docx, template_file_path, context, output_path).result()
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    global _POOL
+
+    processes = SETTINGS['docx']['processes']
+    if not processes:
+        return None
+
+    with _POOL_LOCK:
+        if _POOL is None:
+            # Processes are spawned, forking the application with running threads may copy held locks,
+            # every process parses the templates once on start
+            template_file_paths = [SETTINGS['cover_letter']['template']['file'], SETTINGS['resume']['template']['file']]
+            _POOL = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=load_templates, initargs=(template_file_paths,))
+            atexit.register(_POOL.shutdown)
+        return _POOL
@@ -0,0 +1,243 @@
+import atexit
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+from pathlib import Path
+from queue import Queue, Empty
+from typing import Optional, List
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+except ImportError:
+    # Python bindings of LibreOffice are not installed, documents are converted by soffice processes
+    uno = None
+
+_POOL: Optional["LibreOfficePool"] = None
+_POOL_LOCK = threading.Lock()
+
+
+class LibreOfficeWorker:
+    """
+    Headless LibreOffice instance with its own user profile, so instances do not collide on the profile lock.
+    If Python bindings of LibreOffice are available, the instance is started once and documents are converted
+    over the UNO socket, otherwise every conversion runs soffice with the profile of the worker.
+    :param soffice_path: Path to soffice
+    :param profile_dir: Directory of the user profile of the instance
+    :param start_timeout: Seconds to wait for the instance to accept connections
+    """
+
+    def __init__(self, soffice_path: str, profile_dir: str, start_timeout: float = 30) -> None:
+        self.soffice_path = soffice_path
+        self.profile_dir = profile_dir
+        self.start_timeout = start_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.desktop = None
+        os.makedirs(profile_dir, exist_ok=True)
+
+    @property
+    def profile_option(self) -> str:
+        return f"-env:UserInstallation={Path(self.profile_dir).absolute().as_uri()}"
+
+    def start(self) -> None:
+        if uno is None:
+            return
+
+        port = find_free_port()
+        self.process = subprocess.Popen([
+            self.soffice_path, "--headless", "--invisible", "--nologo", "--nodefault", "--norestore",
+            self.profile_option, f"--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_context
+        )
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            try:
+                context = resolver.resolve(f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext")
+                break
+            except Exception:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"LibreOffice did not start with the profile {self.profile_dir}")
+                time.sleep(0.2)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+
+    def alive(self) -> bool:
+        if uno is None:
+            return True
+        return self.process is not None and self.process.poll() is None and self.desktop is not None
+
+    def convert(self, input_path: str, output_path: str) -> None:
+        if uno is None:
+            subprocess.run([
+                self.soffice_path, "--headless", self.profile_option,
+                "--convert-to", "pdf", "--outdir", os.path.dirname(output_path) or ".", input_path
+            ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return
+
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0, create_properties(Hidden=True)
+        )
+        try:
+            document.storeToURL(
+                uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                create_properties(FilterName="writer_pdf_Export")
+            )
+        finally:
+            document.close(True)
+
+    def stop(self) -> None:
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
+
+
+class LibreOfficePool:
+    """
+    Pool of LibreOffice workers converting documents to PDF in parallel.
+    Workers are started lazily when conversions need them and are kept for the whole run,
+    a worker which crashed is restarted and the conversion is retried once.
+    :param soffice_path: Path to soffice
+    :param size: Maximum number of workers
+    :param profiles_dir: Directory of user profiles of workers
+    :param start_timeout: Seconds to wait for a worker to start
+    """
+
+    def __init__(self, soffice_path: str, size: int, profiles_dir: str, start_timeout: float = 30) -> None:
+        self.soffice_path = soffice_path
+        self.size = max(size, 1)
+        self.profiles_dir = profiles_dir
+        self.start_timeout = start_timeout
+        self.workers: List[LibreOfficeWorker] = []
+        self.stats = {"conversions": 0, "seconds": 0.0, "max_seconds": 0.0, "restarts": 0}
+        self._idle: Queue = Queue()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> LibreOfficeWorker:
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            if len(self.workers) < self.size:
+                worker = LibreOfficeWorker(
+                    self.soffice_path,
+                    os.path.join(self.profiles_dir, f"worker_{len(self.workers)}"),
+                    self.start_timeout
+                )
+                self.workers.append(worker)
+            else:
+                worker = None
+
+        if worker is None:
+            return self._idle.get()
+
+        try:
+            worker.start()
+        except Exception:
+            with self._lock:
+                self.workers.remove(worker)
+            raise
+        return worker
+
+    def release(self, worker: LibreOfficeWorker) -> None:
+        self._idle.put(worker)
+
+    def convert(self, input_path: str, output_path: str) -> float:
+        """
+        Converts the document to PDF.
+        :param input_path: Path to the document
+        :param output_path: Path to the PDF file
+        :return: Seconds spent on the conversion
+        """
+
+        worker = self.acquire()
+        started_at = time.perf_counter()
+        try:
+            try:
+                worker.convert(input_path, output_path)
+            except Exception as e:
+                if worker.alive():
+                    raise
+                logging.warning(f"LibreOffice worker {worker.profile_dir} crashed ({e}), restarting it.")
+                self.restart(worker)
+                worker.convert(input_path, output_path)
+        finally:
+            self.release(worker)
+
+        seconds = time.perf_counter() - started_at
+        with self._lock:
+            self.stats["conversions"] += 1
+            self.stats["seconds"] += seconds
+            self.stats["max_seconds"] = max(self.stats["max_seconds"], seconds)
+        logging.debug(f"{os.path.basename(input_path)} is converted to PDF in {seconds:.2f}s")
+        return seconds
+
+    def restart(self, worker: LibreOfficeWorker) -> None:
+        worker.stop()
+        worker.start()
+        with self._lock:
+            self.stats["restarts"] += 1
+
+    def close(self) -> None:
+        with self._lock:
+            workers = list(self.workers)
+            self.workers.clear()
+        for worker in workers:
+            worker.stop()
+
+    def log_stats(self) -> None:
+        if not self.stats["conversions"]:
+            return
+        logging.info(
+            f"LibreOffice: conversions {self.stats['conversions']}, "
+            f"average {self.stats['seconds'] / self.stats['conversions']:.2f}s, "
+            f"max {self.stats['max_seconds']:.2f}s, restarts {self.stats['restarts']}"
+        )
+
+
+def create_properties(**values) -> tuple:
+    properties = []
+    for name, value in values.items():
+        property_value = PropertyValue()
+        property_value.Name = name
+        property_value.Value = value
+        properties.append(property_value)
+    return tuple(properties)
+
+
+def find_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+
+def get_pool(soffice_path: str, size: int, profiles_dir: str, start_timeout: float = 30) -> LibreOfficePool:
+    global _POOL
+
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = LibreOfficePool(soffice_path, size, profiles_dir, start_timeout)
+            atexit.register(_POOL.close)
+        return _POOL
+
+
+def log_stats() -> None:
+    if _POOL:
+        _POOL.log_stats()
@@ -0,0 +1,119 @@
+import mimetypes
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate, make_msgid
+from typing import Optional, List, Tuple
+
+from job_applier.log import logger
+from job_applier.settings import SETTINGS
+
+_CACHE: Optional["AttachmentCache"] = None
+_CACHE_LOCK = threading.Lock()
+
+
+class AttachmentCache:
+    """
+    Encoded and serialized MIME parts of attachments addressed by the path, the modification time and the size
+    of the file, so a file attached to many messages is read, encoded and serialized once.
+    :param max_entries: Maximum number of parts, the least recently used ones are evicted (0 - nothing is cached)
+    """
+
+    def __init__(self, max_entries: int = 32) -> None:
+        self.max_entries = max_entries
+        self.parts: OrderedDict[Tuple[str, float, int], str] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "encoded_bytes": 0, "saved_bytes": 0}
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_mtime, stat.st_size)
+        with self._lock:
+            part = self.parts.get(key)
+            if part is not None:
+                self.parts.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["saved_bytes"] += len(part)
+                return part
+
+        part = create_attachment(file_path)
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["encoded_bytes"] += len(part)
+            if self.max_entries:
+                self.parts[key] = part
+                while len(self.parts) > self.max_entries:
+                    self.parts.popitem(last=False)
+        return part
+
+    def log_stats(self) -> None:
+        if not self.stats["hits"] + self.stats["misses"]:
+            return
+        logger.info(
+            f"Attachments: encoded {self.stats['misses']} ({self.stats['encoded_bytes'] / 1024 / 1024:.1f} MB), "
+            f"reused {self.stats['hits']} ({self.stats['saved_bytes'] / 1024 / 1024:.1f} MB)"
+        )
+
+
+def create_attachment(file_path: str) -> str:
+    content_type, encoding = mimetypes.guess_type(file_path)
+    if content_type is None or encoding is not None:
+        content_type = "application/octet-stream"
+    main_type, sub_type = content_type.split("/", 1)
+
+    part = MIMEBase(main_type, sub_type)
+    with open(file_path, "rb") as file:
+        part.set_payload(file.read())
+    encoders.encode_base64(part)
+    part.add_header("Content-Disposition", "attachment", filename=os.path.basename(file_path))
+    return part.as_string()
+
+
+def create_message(sender: str, to: str, subject: str, text: str, attachments: List[str],
+                   cache: Optional[AttachmentCache] = None) -> str:
+    """
+    Composes the message with the plain text and attachments.
+    :param sender: Address of the sender
+    :param to: Address of the recipient
+    :param subject: Subject of the message
+    :param text: Text of the message
+    :param attachments: Paths to attached files
+    :param cache: Cache of encoded attachments, files are encoded for every message without it
+    :return: The message with headers
+    """
+
+    # The boundary is set, so the generator does not search it in the text of parts
+    boundary = f"==============={uuid.uuid4().hex}=="
+    message = MIMEMultipart(boundary=boundary)
+    message["From"] = sender
+    message["To"] = to
+    message["Subject"] = subject
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid(domain=(sender or "").rpartition("@")[2] or None)
+    message.attach(MIMEText(text or "", "plain", "utf-8"))
+
+    # Serialized attachments are put before the closing boundary as they are
+    head = message.as_string()
+    parts = [head[:head.rindex(f"\n--{boundary}--")]]
+    for file_path in filter(None, attachments):
+        parts.append(cache.get(file_path) if cache else create_attachment(file_path))
+    return f"\n--{boundary}\n".join(parts) + f"\n--{boundary}--\n"
+
+
+def get_attachment_cache() -> AttachmentCache:
+    global _CACHE
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = AttachmentCache(max_entries=SETTINGS['email']['attachments_cache'])
+        return _CACHE
+
+
+def log_stats() -> None:
+    if _CACHE:
+        _CACHE.log_stats()
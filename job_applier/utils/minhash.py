@@ -0,0 +1,53 @@
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+# The largest prime below 2^32, products of 32-bit values and coefficients below it fit in uint64
+PRIME = 4294967291
+
+SHINGLE_MULTIPLIER = 1000003
+
+
+class MinHasher:
+    """
+    Creates MinHash signatures of texts, the share of equal values of two signatures estimates
+    the Jaccard similarity of sets of word shingles of the texts.
+    Permutations are created with the fixed seed, so signatures saved by previous runs stay comparable.
+    :param permutations: Number of values of a signature
+    :param shingle_size: Number of words in a shingle
+    :param seed: Seed of permutations
+    """
+
+    def __init__(self, permutations: int = 128, shingle_size: int = 3, seed: int = 1) -> None:
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, PRIME, size=(permutations, 1), dtype=np.uint64)
+        self.b = rng.integers(0, PRIME, size=(permutations, 1), dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        words = text.split()
+        if not words:
+            return None
+
+        word_hashes = np.fromiter((zlib.crc32(word.encode()) for word in words), dtype=np.uint64, count=len(words))
+        shingles_count = max(len(words) - self.shingle_size + 1, 1)
+        shingles = word_hashes[:shingles_count].copy()
+        for offset in range(1, min(self.shingle_size, len(words))):
+            shingles = (shingles * SHINGLE_MULTIPLIER + word_hashes[offset:offset + shingles_count]) & 0xFFFFFFFF
+        shingles = np.unique(shingles)
+
+        return ((self.a * shingles + self.b) % PRIME).min(axis=1).astype(np.uint32)
+
+
+def get_bands(signature: np.ndarray, bands: int) -> List[int]:
+    """
+    Hashes bands of the signature for the LSH index, signatures with an equal band are candidates
+    for near-duplicates.
+    """
+
+    return [zlib.crc32(band.tobytes()) for band in np.split(signature, bands)]
+
+
+def estimate_similarity(signature: np.ndarray, other_signature: np.ndarray) -> float:
+    return float(np.mean(signature == other_signature))
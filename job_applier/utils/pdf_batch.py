@@ -0,0 +1,121 @@
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+_CONVERTER: Optional["PdfBatchConverter"] = None
+_CONVERTER_LOCK = threading.Lock()
+
+
+class PdfBatchConverter:
+    """
+    Converts enqueued documents to PDF by few soffice invocations, every invocation converts many files.
+    Documents are split into shards converted in parallel, every shard uses its own LibreOffice profile.
+    :param soffice_path: Path to soffice
+    :param shards: Number of soffice processes running in parallel
+    :param profiles_dir: Directory of user profiles of processes
+    """
+
+    def __init__(self, soffice_path: str, shards: int, profiles_dir: str) -> None:
+        self.soffice_path = soffice_path
+        self.shards = max(shards, 1)
+        self.profiles_dir = profiles_dir
+        self.pending: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+
+    def enqueue(self, input_path: str, output_path: str) -> None:
+        with self._lock:
+            self.pending.append((input_path, output_path))
+
+    def flush(self) -> List[Tuple[str, str]]:
+        """
+        Converts all enqueued documents.
+        :return: Documents which were not converted
+        """
+
+        with self._lock:
+            pending, self.pending = self.pending, []
+        if not pending:
+            return []
+
+        started_at = time.perf_counter()
+
+        # Runs save files into temporary directories and files are moved to their places after,
+        # so documents of all output directories are converted together. soffice names outputs by inputs,
+        # so documents with the same name go to different runs of the shard.
+        shard_runs: List[List[List[Tuple[str, str]]]] = [[] for _ in range(min(self.shards, len(pending)))]
+        for index, document in enumerate(pending):
+            name = Path(document[0]).stem
+            shard = shard_runs[index % len(shard_runs)]
+            run = next((run for run in shard if all(Path(path).stem != name for path, _ in run)), None)
+            if run is None:
+                run = []
+                shard.append(run)
+            run.append(document)
+
+        # Runs of the same shard share the profile, so they go one after another
+        with ThreadPoolExecutor(max_workers=len(shard_runs)) as executor:
+            futures = [executor.submit(self.convert_runs, shard, shard_run_list)
+                       for shard, shard_run_list in enumerate(shard_runs)]
+
+        # Outputs of previous runs may exist, so only files moved by this conversion are counted
+        converted = set()
+        for future in futures:
+            try:
+                converted.update(future.result())
+            except Exception as e:
+                logging.error(f"Unexpected error while converting documents to PDF: {e}")
+        failed = [document for document in pending if document not in converted]
+        logging.info(f"{len(pending) - len(failed)} documents are converted to PDF "
+                     f"by {sum(map(len, shard_runs))} soffice runs in {time.perf_counter() - started_at:.2f}s")
+        return failed
+
+    def convert_runs(self, shard: int, runs: List[List[Tuple[str, str]]]) -> List[Tuple[str, str]]:
+        return [document for documents in runs for document in self.convert(shard, documents)]
+
+    def convert(self, shard: int, documents: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """
+        Converts documents by one soffice run.
+        :param shard: Number of the shard whose profile is used
+        :param documents: Paths to input files and output PDF files, names of input files are unique
+        :return: Documents which were converted and moved to their output paths
+        """
+
+        converted = []
+        profile_dir = Path(self.profiles_dir, f"batch_{shard}").absolute()
+        # The temporary directory is next to profiles, so files are moved within the same disk
+        os.makedirs(self.profiles_dir, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix=f"batch_{shard}_", dir=self.profiles_dir) as output_dir:
+            try:
+                subprocess.run([
+                    self.soffice_path, "--headless", f"-env:UserInstallation={profile_dir.as_uri()}",
+                    "--convert-to", "pdf", "--outdir", output_dir, *(input_path for input_path, _ in documents)
+                ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except Exception as e:
+                logging.error(f"Unexpected error while converting {len(documents)} documents to PDF: {e}")
+
+            for input_path, output_path in documents:
+                converted_path = os.path.join(output_dir, f"{Path(input_path).stem}.pdf")
+                if not os.path.exists(converted_path):
+                    continue
+                try:
+                    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                    os.replace(converted_path, output_path)
+                    converted.append((input_path, output_path))
+                except OSError as e:
+                    logging.error(f"Unexpected error while moving {converted_path} to {output_path}: {e}")
+        return converted
+
+
+def get_converter(soffice_path: str, shards: int, profiles_dir: str) -> PdfBatchConverter:
+    global _CONVERTER
+
+    with _CONVERTER_LOCK:
+        if _CONVERTER is None:
+            _CONVERTER = PdfBatchConverter(soffice_path, shards, profiles_dir)
+        return _CONVERTER
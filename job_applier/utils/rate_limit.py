@@ -0,0 +1,61 @@
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    :param rate: Number of tokens added per second (0 or less - unlimited)
+    :param capacity: Maximum number of tokens, i.e. the allowed burst of requests
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Blocks until the amount of tokens is available and takes it.
+        :param amount: Number of tokens to take, an amount above the capacity is limited to the capacity
+        :return: Seconds spent waiting for the tokens
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def consume(self, amount: float) -> None:
+        """
+        Takes the amount of tokens without waiting, the bucket can go into debt which is paid by next acquires.
+        A negative amount returns tokens to the bucket.
+        """
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+
+def get_backoff(attempt: int, backoff: float, max_backoff: float) -> float:
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(max_backoff, backoff * 2 ** attempt))
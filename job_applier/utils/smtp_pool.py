@@ -0,0 +1,202 @@
+import atexit
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from queue import Queue, Empty
+from typing import Optional, List
+
+_POOL: Optional["SmtpPool"] = None
+_POOL_LOCK = threading.Lock()
+
+# Errors after which the connection is opened again and the message is sent once more
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SmtpConnection:
+    """
+    Authenticated SMTP connection kept open between messages.
+    :param host: SMTP server host
+    :param port: SMTP server port, the connection is encrypted with SSL on the port 465
+    :param user: User of the server
+    :param password: Password of the user, the login is skipped if it is empty
+    :param timeout: Seconds to wait for the server
+    :param starttls: If true, plain connections are upgraded with STARTTLS
+    :param idle_timeout: Seconds after which an idle connection is checked before sending
+    """
+
+    def __init__(self, host: str, port: int, user: str, password: Optional[str], timeout: float = 60,
+                 starttls: bool = True, idle_timeout: float = 240) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.smtp: Optional[smtplib.SMTP] = None
+        self.used_at = 0.0
+
+    def connect(self) -> None:
+        if self.port == 465:
+            self.smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout,
+                                         context=ssl.create_default_context())
+        else:
+            self.smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                self.smtp.starttls(context=ssl.create_default_context())
+        if self.password:
+            self.smtp.login(self.user, self.password)
+        self.used_at = time.monotonic()
+
+    def alive(self) -> bool:
+        if self.smtp is None:
+            return False
+        if time.monotonic() - self.used_at < self.idle_timeout:
+            return True
+
+        # Servers close connections which are idle for a while
+        try:
+            return self.smtp.noop()[0] == 250
+        except Exception:
+            return False
+
+    def send(self, recipients: List[str], message: str) -> None:
+        self.smtp.sendmail(self.user, recipients, message)
+        self.used_at = time.monotonic()
+
+    def close(self) -> None:
+        if self.smtp is None:
+            return
+        try:
+            self.smtp.quit()
+        except Exception:
+            self.smtp.close()
+        self.smtp = None
+
+
+class SmtpPool:
+    """
+    Pool of SMTP connections kept open for the whole run, messages are sent over them in parallel.
+    Connections are opened lazily when messages need them, a connection which was dropped
+    or timed out is opened again and the message is sent once more.
+    :param host: SMTP server host
+    :param port: SMTP server port
+    :param user: User of the server
+    :param password: Password of the user
+    :param size: Maximum number of connections
+    :param timeout: Seconds to wait for the server
+    :param starttls: If true, plain connections are upgraded with STARTTLS
+    :param idle_timeout: Seconds after which an idle connection is checked before sending
+    """
+
+    def __init__(self, host: str, port: int, user: str, password: Optional[str], size: int = 1,
+                 timeout: float = 60, starttls: bool = True, idle_timeout: float = 240) -> None:
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = max(size, 1)
+        self.timeout = timeout
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.connections: List[SmtpConnection] = []
+        self.stats = {"messages": 0, "seconds": 0.0, "max_seconds": 0.0, "connects": 0, "reconnects": 0}
+        self._idle: Queue = Queue()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> SmtpConnection:
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            if len(self.connections) < self.size:
+                connection = SmtpConnection(self.host, self.port, self.user, self.password, self.timeout,
+                                            self.starttls, self.idle_timeout)
+                self.connections.append(connection)
+            else:
+                connection = None
+
+        if connection is None:
+            return self._idle.get()
+        return connection
+
+    def release(self, connection: SmtpConnection) -> None:
+        self._idle.put(connection)
+
+    def send(self, recipients: List[str], message: str) -> float:
+        """
+        Sends the message.
+        :param recipients: Addresses of recipients
+        :param message: The message with headers
+        :return: Seconds spent on sending
+        """
+
+        connection = self.acquire()
+        started_at = time.perf_counter()
+        try:
+            if not connection.alive():
+                self.connect(connection)
+            try:
+                connection.send(recipients, message)
+            except CONNECTION_ERRORS as e:
+                logging.warning(f"SMTP connection to {self.host} is lost ({e}), reconnecting.")
+                self.connect(connection)
+                connection.send(recipients, message)
+        except Exception:
+            # The state of the connection is unknown, it is opened again for the next message
+            connection.close()
+            raise
+        finally:
+            self.release(connection)
+
+        seconds = time.perf_counter() - started_at
+        with self._lock:
+            self.stats["messages"] += 1
+            self.stats["seconds"] += seconds
+            self.stats["max_seconds"] = max(self.stats["max_seconds"], seconds)
+        logging.debug(f"Message to {', '.join(recipients)} is sent in {seconds:.2f}s")
+        return seconds
+
+    def connect(self, connection: SmtpConnection) -> None:
+        reconnect = connection.smtp is not None
+        connection.close()
+        connection.connect()
+        with self._lock:
+            self.stats["reconnects" if reconnect else "connects"] += 1
+
+    def close(self) -> None:
+        with self._lock:
+            connections = list(self.connections)
+            self.connections.clear()
+        for connection in connections:
+            connection.close()
+
+    def log_stats(self) -> None:
+        if not self.stats["messages"]:
+            return
+        logging.info(
+            f"SMTP: messages {self.stats['messages']}, "
+            f"average {self.stats['seconds'] / self.stats['messages']:.2f}s, "
+            f"max {self.stats['max_seconds']:.2f}s, connections {self.stats['connects']}, "
+            f"reconnects {self.stats['reconnects']}"
+        )
+
+
+def get_pool(host: str, port: int, user: str, password: Optional[str], size: int = 1, timeout: float = 60,
+             starttls: bool = True, idle_timeout: float = 240) -> SmtpPool:
+    global _POOL
+
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = SmtpPool(host, port, user, password, size, timeout, starttls, idle_timeout)
+            atexit.register(_POOL.close)
+        return _POOL
+
+
+def log_stats() -> None:
+    if _POOL:
+        _POOL.log_stats()
@@ -0,0 +1,89 @@
+import math
+import re
+import string
+from collections import Counter
+from itertools import chain
+from typing import List
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9+#]+")
+
+# ASCII characters which can not be a part of a token
+SEPARATORS = str.maketrans({char: " " for char in string.punctuation + string.whitespace if char not in "+#"})
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "into", "is", "it", "its",
+    "of", "on", "or", "our", "that", "the", "their", "this", "to", "was", "we", "will", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOP_WORDS]
+
+
+def count_terms(text: str) -> Counter:
+    """
+    Counts tokens of the text, the result is the same as counting tokenize(text), but faster:
+    the text is split by ASCII separators and only unusual words are tokenized by the pattern.
+    """
+
+    counts = Counter((text or "").lower().translate(SEPARATORS).split())
+    for word in [word for word in counts
+                 if len(word) < 2 or not word[0].isalpha() or not word.isascii() or word in STOP_WORDS]:
+        count = counts.pop(word)
+        for token in TOKEN_PATTERN.findall(word):
+            if token not in STOP_WORDS:
+                counts[token] += count
+    return counts
+
+
+class TfidfScorer:
+    """
+    Scores documents by the cosine similarity of their TF-IDF vectors to the query.
+    Term frequencies are sublinear (1 + log tf), IDF is smoothed and computed over the scored documents,
+    so scores are in the range [0, 1] but depend on the other documents scored with them.
+    All documents are scored at once with sparse vectors kept as NumPy arrays of (document, term, weight).
+    :param query: The text documents are compared with
+    """
+
+    def __init__(self, query: str) -> None:
+        self.query_tokens = tokenize(query)
+
+    def score(self, documents: List[str]) -> np.ndarray:
+        if not documents or not self.query_tokens:
+            return np.zeros(len(documents))
+
+        counters = [count_terms(document) for document in documents]
+
+        # Terms of the query get the first IDs
+        vocabulary = {term: term_id for term_id, term in enumerate(dict.fromkeys(chain(self.query_tokens, *counters)))}
+
+        documents_count = len(documents)
+        terms_count = len(vocabulary)
+        sizes = np.fromiter(map(len, counters), dtype=np.int64, count=documents_count)
+        pairs_count = int(sizes.sum())
+        pair_documents = np.repeat(np.arange(documents_count), sizes)
+        pair_terms = np.fromiter(map(vocabulary.__getitem__, chain.from_iterable(counters)),
+                                 dtype=np.int64, count=pairs_count)
+        counts = np.fromiter(chain.from_iterable(counter.values() for counter in counters),
+                             dtype=np.float64, count=pairs_count)
+
+        document_frequency = np.bincount(pair_terms, minlength=terms_count)
+        idf = np.log((1 + documents_count) / (1 + document_frequency)) + 1
+
+        weights = (1 + np.log(counts)) * idf[pair_terms]
+        norms = np.sqrt(np.bincount(pair_documents, weights=weights ** 2, minlength=documents_count))
+
+        query_terms, query_counts = np.unique(
+            np.fromiter((vocabulary[token] for token in self.query_tokens), dtype=np.int64),
+            return_counts=True
+        )
+        query_vector = np.zeros(terms_count)
+        query_vector[query_terms] = (1 + np.log(query_counts)) * idf[query_terms]
+        query_norm = math.sqrt(float(query_vector @ query_vector))
+
+        dot = np.bincount(pair_documents, weights=weights * query_vector[pair_terms], minlength=documents_count)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(norms > 0, dot / (norms * query_norm), 0.0)
+        return scores
@@ -1,9 +1,19 @@
-from job_applier import start, init
+import argparse
+
+from job_applier import start, init, artifacts
 
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", nargs="?", choices=["start", "gc"], default="start",
+                        help="start - find jobs and apply, gc - remove stored documents which are not used anymore")
+    args = parser.parse_args()
+
     init()
-    start()
+    if args.command == "gc":
+        artifacts.collect_garbage()
+    else:
+        start()
 
 
 if __name__ == "__main__":